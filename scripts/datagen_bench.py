@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Synthetic data generation benchmark: per-dict generators vs aws_analytics.datagen"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from aws_analytics.datagen import DataGenerator
+from aws_analytics.utils import get_logger
+from opensearch_indexing import generate_aws_documents
+from kds_producer import generate_order
+from putrecord_firehose import create_compliance_event_record
+
+def load_messages(count):
+    """Messages built like MSKService.generate_load"""
+    for i in range(count):
+        yield {'timestamp': time.time(), 'thread_id': 0, 'count': i}
+
+PER_DICT_GENERATORS = {
+    'aws_documents': generate_aws_documents,
+    'orders': lambda count: (generate_order() for _ in range(count)),
+    'compliance_events': lambda count: (create_compliance_event_record() for _ in range(count)),
+    'load_messages': load_messages
+}
+
+def bench_per_dict(kind, count):
+    """Records/s building dicts one at a time and json.dumps-ing each"""
+    started = time.perf_counter()
+    for record in PER_DICT_GENERATORS[kind](count):
+        json.dumps(record).encode('utf-8')
+    return count / (time.perf_counter() - started)
+
+def bench_vectorized(kind, count, batch_size, seed, as_dicts=False):
+    """Records/s from columnar batches, encoded to JSON lines (or expanded to dicts)"""
+    generator = DataGenerator(seed=seed)
+    started = time.perf_counter()
+    for batch in generator.batches(kind, count, batch_size):
+        if as_dicts:
+            batch.records()
+        else:
+            batch.to_json_lines()
+    return count / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-dict and vectorized synthetic event generation')
+    parser.add_argument('-n', '--count', type=int, default=200000,
+                       help='Records per generator (default: 200000)')
+    parser.add_argument('-b', '--batch-size', type=int, default=10000,
+                       help='Records per vectorized batch (default: 10000)')
+    parser.add_argument('-k', '--kinds', type=str, default=','.join(DataGenerator.KINDS),
+                       help=f"Comma-separated event kinds (default: {','.join(DataGenerator.KINDS)})")
+    parser.add_argument('--seed', type=int, default=42,
+                       help='Seed for the vectorized generator (default: 42)')
+    
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+    
+    for kind in args.kinds.split(','):
+        per_dict = bench_per_dict(kind, args.count)
+        vectorized = bench_vectorized(kind, args.count, args.batch_size, args.seed)
+        as_dicts = bench_vectorized(kind, args.count, args.batch_size, args.seed, as_dicts=True)
+        logger.info(f"{kind:<18} per-dict {per_dict:>10,.0f} rec/s | "
+                    f"vectorized JSON lines {vectorized:>10,.0f} rec/s ({vectorized / per_dict:.1f}x) | "
+                    f"vectorized dicts {as_dicts:>10,.0f} rec/s ({as_dicts / per_dict:.1f}x)")
+
+if __name__ == "__main__":
+    main()
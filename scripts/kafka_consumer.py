@@ -1,60 +1,54 @@
-from kafka import KafkaConsumer
-from dotenv import load_dotenv
-import os
-import json
-from datetime import datetime
+#!/usr/bin/env python3
+"""Kafka Consumer Script, streams a topic to rotating NDJSON files"""
 
-load_dotenv()
+import sys
+import argparse
+from pathlib import Path
 
-def safe_deserialize(x):
-    """Safely deserialize message value"""
-    if not x:
-        return None
-    try:
-        return json.loads(x.decode('utf-8'))
-    except (json.JSONDecodeError, UnicodeDecodeError):
-        # Return raw bytes as string if not JSON
-        return x.decode('utf-8', errors='ignore')
-
-# Kafka consumer configuration
-consumer = KafkaConsumer(
-    'dev-mysql-groovy.dev.users',
-    bootstrap_servers=os.getenv('MSK_BOOTSTRAP_SERVERS').split(','),
-    auto_offset_reset='earliest',  # Start from beginning
-    enable_auto_commit=True,
-    value_deserializer=safe_deserialize
-)
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-print("Starting to consume messages from topic: dev-mysql.dev.users")
-print("Press Ctrl+C to stop\n")
+from aws_analytics.services import MSKConsumerService
+from aws_analytics.utils import get_logger
 
-messages = []
-
-try:
-    for message in consumer:
-        msg_data = {
-            'offset': message.offset,
-            'partition': message.partition,
-            'timestamp': message.timestamp,
-            'key': message.key.decode('utf-8') if message.key else None,
-            'value': message.value
-        }
-        messages.append(msg_data)
-        
-        print(f"Offset: {message.offset}")
-        print(f"Key: {message.key}")
-        print(f"Value: {json.dumps(message.value, indent=2, default=str)}")
-        print("-" * 80)
-except KeyboardInterrupt:
-    print("\nStopping consumer...")
-finally:
-    consumer.close()
+def main():
+    parser = argparse.ArgumentParser(description='Consume a Kafka topic into rotating NDJSON files')
+    parser.add_argument('-t', '--topic', type=str, default='dev-mysql-groovy.dev.users',
+                       help='Topic to consume (default: dev-mysql-groovy.dev.users)')
+    parser.add_argument('-g', '--group-id', type=str, default='aws-analytics-ndjson',
+                       help='Consumer group id used for offset commits (default: aws-analytics-ndjson)')
+    parser.add_argument('--iam', action='store_true',
+                       help='Authenticate with IAM (SASL/OAUTHBEARER) against MSK_BS_IAM (default: MSK_AUTH)')
+    parser.add_argument('-o', '--output-dir', type=str, default='kafka_messages',
+                       help='Directory for NDJSON segments (default: kafka_messages)')
+    parser.add_argument('--max-mb', type=float, default=128,
+                       help='Rotate segments after this many MB (default: 128)')
+    parser.add_argument('--max-seconds', type=float, default=300,
+                       help='Rotate segments after this many seconds (default: 300)')
+    parser.add_argument('--gzip', action='store_true',
+                       help='Gzip segment files (default: false)')
+    parser.add_argument('--print', dest='print_records', action='store_true',
+                       help='Also print every record to stdout (default: false)')
+    
+    args = parser.parse_args()
+    logger = get_logger(__name__)
     
-    # Save to JSON file
-    if messages:
-        filename = f"kafka_messages_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(messages, f, indent=2, ensure_ascii=False, default=str)
-        print(f"\nSaved {len(messages)} messages to {filename}")
-    else:
-        print("\nNo messages consumed")
+    consumer = MSKConsumerService(args.topic, group_id=args.group_id, auth='iam' if args.iam else None)
+    logger.info(f"Starting to consume messages from topic: {args.topic}, press Ctrl+C to stop")
+    
+    try:
+        consumer.consume_to_ndjson(
+            args.output_dir,
+            max_bytes=int(args.max_mb * 1024 * 1024),
+            max_seconds=args.max_seconds,
+            compress=args.gzip,
+            print_records=args.print_records
+        )
+    except KeyboardInterrupt:
+        logger.info("Stopping consumer...")
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
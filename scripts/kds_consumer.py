@@ -1,33 +1,49 @@
-import boto3
-import json
-import time
+#!/usr/bin/env python3
+"""Kinesis Consumer Script, reads every shard concurrently with local checkpoints"""
 
-kinesis = boto3.client('kinesis', region_name='us-east-1')
-stream_name = 'test-sink'
+import sys
+import json
+import argparse
+from pathlib import Path
 
-# Get all shards
-response = kinesis.describe_stream(StreamName=stream_name)
-shards = response['StreamDescription']['Shards']
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-# Get iterator for each shard
-shard_iterators = {}
-for shard in shards:
-    shard_id = shard['ShardId']
-    shard_iterators[shard_id] = kinesis.get_shard_iterator(
-        StreamName=stream_name,
-        ShardId=shard_id,
-        ShardIteratorType='LATEST'
-    )['ShardIterator']
+from aws_analytics.services import KinesisService
+from aws_analytics.utils import get_logger
 
-# Consume from all shards
-while True:
-    for shard_id, iterator in list(shard_iterators.items()):
-        response = kinesis.get_records(ShardIterator=iterator, Limit=100)
-        
-        for record in response['Records']:
-            data = json.loads(record['Data'])
-            print(f"Shard {shard_id}: {data}")
-        
-        shard_iterators[shard_id] = response['NextShardIterator']
+def main():
+    parser = argparse.ArgumentParser(description='Consume every shard of a Kinesis stream')
+    parser.add_argument('-s', '--stream', type=str, default='test-sink',
+                       help='Stream name (default: test-sink)')
+    parser.add_argument('-c', '--checkpoint-db', type=str, default='kinesis_checkpoints.db',
+                       help='SQLite file for shard checkpoints (default: kinesis_checkpoints.db)')
+    parser.add_argument('--start', type=str, default='LATEST', choices=['LATEST', 'TRIM_HORIZON'],
+                       help='Where shards without a checkpoint start (default: LATEST)')
+    parser.add_argument('--limit', type=int, default=10000,
+                       help='Max records per get_records call (default: 10000)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                       help='Do not print records, only log throughput (default: false)')
+    
+    args = parser.parse_args()
+    logger = get_logger(__name__)
     
-    time.sleep(1)
+    def print_record(record):
+        if not args.quiet:
+            print(f"Shard {record['ShardId']}: {json.loads(record['Data'])}")
+    
+    kinesis = KinesisService(stream_name=args.stream)
+    logger.info(f"Consuming stream {args.stream}, press Ctrl+C to stop")
+    
+    try:
+        metrics = kinesis.consume(print_record, checkpoint_path=args.checkpoint_db,
+                                  initial_position=args.start, limit=args.limit)
+        logger.info(f"Consumer stopped: {metrics}")
+    except KeyboardInterrupt:
+        logger.info("Stopping consumer...")
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,25 @@
-import boto3
-import json
+#!/usr/bin/env python3
+"""Kinesis Order Event Producer Script"""
+
+import sys
 import time
 import random
 import uuid
+import argparse
+from pathlib import Path
 from datetime import datetime
 
-kinesis = boto3.client('kinesis', region_name='us-east-1')
-stream_name = 'test-source'
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from aws_analytics.services import KinesisService
+from aws_analytics.utils import get_logger
 
 product_categories = ['Electronics', 'Clothing', 'Books', 'Home', 'Sports']
 
-while True:
-    data = {
+def generate_order():
+    """Generate a sample order event"""
+    return {
         'orderId': str(uuid.uuid4()),
         'customerId': f'CUST-{random.randint(1000, 9999)}',
         'productCategory': random.choice(product_categories),
@@ -19,14 +27,51 @@ while True:
         'quantity': random.randint(1, 10),
         'timestamp': datetime.now().isoformat()
     }
+
+def main():
+    parser = argparse.ArgumentParser(description='Send sample order events to a Kinesis stream')
+    parser.add_argument('-s', '--stream', type=str, default='test-source',
+                       help='Stream name (default: test-source)')
+    parser.add_argument('-r', '--rate', type=float, default=2,
+                       help='Orders per second (default: 2)')
+    parser.add_argument('-n', '--count', type=int,
+                       help='Stop after this many orders (default: run until interrupted)')
+    parser.add_argument('-p', '--partitioner', type=str, default='random',
+                       choices=['random', 'field', 'round-robin'],
+                       help='Partition key strategy (default: random)')
+    parser.add_argument('--partition-field', type=str, default='customerId',
+                       help='Order field hashed by the field partitioner (default: customerId)')
+    parser.add_argument('--aggregate', action='store_true',
+                       help='Pack orders into KPL aggregated records (default: false)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                       help='Log every order sent (default: false)')
     
-    partition_key = str(uuid.uuid4())
+    args = parser.parse_args()
+    logger = get_logger(__name__)
     
-    kinesis.put_record(
-        StreamName=stream_name,
-        Data=json.dumps(data),
-        PartitionKey=partition_key
-    )
+    kinesis = KinesisService(stream_name=args.stream, partitioner=args.partitioner,
+                             partition_field=args.partition_field)
+    producer = kinesis.batch_producer(aggregate=args.aggregate)
+    sent = 0
     
-    print(f"Sent: {data}")
-    time.sleep(0.5)
+    try:
+        while args.count is None or sent < args.count:
+            data = generate_order()
+            producer.put(data)
+            sent += 1
+            
+            if args.verbose:
+                logger.info(f"Sent: {data}")
+            elif sent % 1000 == 0:
+                logger.info(f"Sent {sent} orders")
+            
+            time.sleep(1.0 / args.rate)
+    except KeyboardInterrupt:
+        logger.info("Stopping producer...")
+    finally:
+        producer.close()
+        logger.info(f"Sent {sent} orders: {producer.stats}")
+        logger.info(f"Records per shard: {dict(sorted(producer.shard_counts.items()))}")
+
+if __name__ == "__main__":
+    main()
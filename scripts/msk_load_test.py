@@ -2,7 +2,7 @@
 """MSK Load Testing Script"""
 
 import sys
-import time
+import argparse
 from pathlib import Path
 
 # Add src to path
@@ -12,27 +12,72 @@ from aws_analytics.services import MSKService
 from aws_analytics.config import Settings
 from aws_analytics.utils import get_logger
 
+def log_summary(logger, summary):
+    """Log the final load test summary"""
+    logger.info(f"=== Load test summary ({summary['workers']} {summary['mode']} workers) ===")
+    logger.info(f"Elapsed: {summary['elapsed_sec']:.1f}s")
+    logger.info(f"Sent: {summary['sent']}, acked: {summary['acked']}, errors: {summary['errors']}")
+    logger.info(f"Achieved rate: {summary['rate']:.0f} msg/sec, {summary['bytes']} bytes acked")
+    logger.info(
+        f"Ack latency: p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms "
+        f"p99={summary['p99_ms']:.1f}ms max={summary['max_ms']:.1f}ms"
+    )
+
 def main():
+    parser = argparse.ArgumentParser(description='Generate producer load against MSK')
+    parser.add_argument('-t', '--threads', type=int, default=5,
+                       help='Number of producer threads (default: 5)')
+    parser.add_argument('-m', '--mode', choices=['thread', 'process'], default='thread',
+                       help='Run workers as threads or as processes with their own producers (default: thread)')
+    parser.add_argument('-w', '--workers', type=int,
+                       help='Number of worker processes in process mode (default: --threads)')
+    parser.add_argument('--serializer', default='json',
+                       help='Value serializer: json, orjson, msgpack, load-message (default: json)')
+    parser.add_argument('--compression', default='gzip',
+                       help='Compression codec: none, gzip, snappy, lz4, zstd (default: gzip)')
+    parser.add_argument('--iam', action='store_true',
+                       help='Authenticate with IAM (SASL/OAUTHBEARER) against MSK_BS_IAM (default: MSK_AUTH)')
+    parser.add_argument('-r', '--rate', type=int, default=500,
+                       help='Target messages per second per worker (default: 500)')
+    parser.add_argument('-d', '--duration', type=float,
+                       help='Stop after this many seconds (default: run until interrupted)')
+    parser.add_argument('--burst', type=float,
+                       help='Token bucket burst size (default: 1%% of rate)')
+    parser.add_argument('--report-interval', type=float, default=10,
+                       help='Seconds between progress reports (default: 10)')
+    
+    args = parser.parse_args()
     logger = get_logger(__name__)
     
     try:
         Settings.validate()
-        msk = MSKService()
+        msk = MSKService(serializer=args.serializer, compression=args.compression, auth='iam' if args.iam else None)
         
         logger.info("Starting MSK load test...")
-        threads = msk.generate_load(num_threads=5, messages_per_sec=500)
+        load = msk.generate_load(
+            num_threads=args.threads,
+            messages_per_sec=args.rate,
+            duration=args.duration,
+            burst=args.burst,
+            report_interval=args.report_interval,
+            mode=args.mode,
+            num_workers=args.workers
+        )
         
-        # Keep running until interrupted
+        # Keep running until interrupted or the duration elapses
         try:
-            while True:
-                time.sleep(10)
-                logger.info(f"Load test running with {len(threads)} threads")
+            while not load.wait(timeout=1):
+                pass
         except KeyboardInterrupt:
             logger.info("Stopping load test...")
-            
+            load.stop()
+            load.wait()
+        
+        log_summary(logger, load.summary())
+    
     except Exception as e:
         logger.error(f"Error: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
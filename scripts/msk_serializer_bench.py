@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""MSK Serializer/Codec Benchmark Script"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from aws_analytics.services import MSKService
+from aws_analytics.utils import get_logger
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark producer serializers and compression codecs')
+    parser.add_argument('-s', '--serializers', type=str,
+                       help='Comma separated serializers (default: all installed)')
+    parser.add_argument('-c', '--codecs', type=str,
+                       help='Comma separated codecs: none,gzip,snappy,lz4,zstd (default: all installed)')
+    parser.add_argument('-p', '--payload', type=str,
+                       help='Path to a JSON file with the sample message (default: generate_load message)')
+    parser.add_argument('-n', '--num-messages', type=int, default=10000,
+                       help='Messages per combination (default: 10000)')
+    parser.add_argument('--batch-size', type=int, default=100,
+                       help='Messages per compressed batch (default: 100)')
+    parser.add_argument('--end-to-end', action='store_true',
+                       help='Also send through a producer to MSK_BOOTSTRAP_SERVERS/MSK_TOPIC')
+    
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+    
+    message = None
+    if args.payload:
+        with open(args.payload, encoding='utf-8') as f:
+            message = json.load(f)
+    
+    try:
+        msk = MSKService()
+        results = msk.benchmark_serialization(
+            message=message,
+            serializers=args.serializers.split(',') if args.serializers else None,
+            codecs=args.codecs.split(',') if args.codecs else None,
+            num_messages=args.num_messages,
+            batch_size=args.batch_size,
+            end_to_end=args.end_to_end
+        )
+        
+        print(f"{'serializer':<14}{'codec':<8}{'encode ns/msg':>15}{'raw B/msg':>11}{'comp B/msg':>12}{'msgs/s':>12}")
+        for r in results:
+            rate = f"{r['msgs_per_sec']:.0f}" if r['msgs_per_sec'] else '-'
+            print(f"{r['serializer']:<14}{r['codec']:<8}{r['encode_ns']:>15.0f}"
+                  f"{r['raw_bytes']:>11.1f}{r['compressed_bytes']:>12.1f}{rate:>12}")
+    
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Sync vs async OpenSearch client benchmark against a local stub HTTP server"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from opensearchpy import OpenSearch, AsyncOpenSearch
+from aws_analytics.services import OpenSearchService, AsyncOpenSearchService
+from aws_analytics.utils import get_logger
+
+SEARCH_RESPONSE = json.dumps({
+    'took': 1, 'timed_out': False,
+    'hits': {'total': {'value': 1, 'relation': 'eq'}, 'hits': [{'_id': '1', '_source': {'message': 'ok'}}]}
+}).encode('utf-8')
+
+def make_handler(latency):
+    class StubHandler(BaseHTTPRequestHandler):
+        """Answers _search and _bulk like an OpenSearch node, after an optional delay"""
+        protocol_version = 'HTTP/1.1'
+        
+        def _respond(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length) if length else b''
+            if latency:
+                time.sleep(latency)
+            
+            if '/_bulk' in self.path:
+                docs = body.count(b'\n') // 2
+                payload = json.dumps({'took': 1, 'errors': False,
+                                      'items': [{'index': {'status': 201}}] * docs}).encode('utf-8')
+            else:
+                payload = SEARCH_RESPONSE
+            
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        do_GET = do_POST = do_PUT = _respond
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return StubHandler
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+def _serve(latency, ports):
+    server = StubServer(('127.0.0.1', 0), make_handler(latency))
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+def start_stub_server(latency):
+    """Stub server in its own process (so it does not share the client's GIL), returns (process, port)"""
+    ports = mp.Queue()
+    process = mp.Process(target=_serve, args=(latency, ports), daemon=True)
+    process.start()
+    return process, ports.get(timeout=10)
+
+def bench_sync(port, requests, concurrency):
+    """Search requests/s with the sync service on a thread pool"""
+    client = OpenSearch(hosts=[{'host': '127.0.0.1', 'port': port}], use_ssl=False, pool_maxsize=concurrency)
+    service = OpenSearchService(client=client)
+    query = {'query': {'match_all': {}}}
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: service.search('bench', query), range(requests)))
+    return requests / (time.perf_counter() - started)
+
+async def bench_async(port, requests, concurrency):
+    """Search requests/s with the async service and a semaphore"""
+    client = AsyncOpenSearch(hosts=[{'host': '127.0.0.1', 'port': port}], use_ssl=False, maxsize=concurrency)
+    query = {'query': {'match_all': {}}}
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with AsyncOpenSearchService(client=client) as service:
+        async def one():
+            async with semaphore:
+                await service.search('bench', query)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+async def bench_async_bulk(port, docs, concurrency):
+    """Documents/s through AsyncOpenSearchService.bulk_index"""
+    client = AsyncOpenSearch(hosts=[{'host': '127.0.0.1', 'port': port}], use_ssl=False, maxsize=concurrency)
+    async with AsyncOpenSearchService(client=client) as service:
+        started = time.perf_counter()
+        await service.bulk_index('bench', ({'id': str(i), 'value': i} for i in range(docs)), concurrency=concurrency)
+        return docs / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and async OpenSearch clients against a local stub server')
+    parser.add_argument('-n', '--requests', type=int, default=2000,
+                       help='Search requests per client (default: 2000)')
+    parser.add_argument('-c', '--concurrency', type=int, default=32,
+                       help='Concurrent requests / threads (default: 32)')
+    parser.add_argument('--latency-ms', type=float, default=20,
+                       help='Simulated server latency per request in ms (default: 20)')
+    parser.add_argument('--bulk-docs', type=int, default=50000,
+                       help='Documents for the async bulk run, 0 to skip (default: 50000)')
+    
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+    
+    server, port = start_stub_server(args.latency_ms / 1000)
+    try:
+        sync_rps = bench_sync(port, args.requests, args.concurrency)
+        logger.info(f"sync  search: {sync_rps:,.0f} req/s ({args.concurrency} threads)")
+        
+        async_rps = asyncio.run(bench_async(port, args.requests, args.concurrency))
+        logger.info(f"async search: {async_rps:,.0f} req/s ({args.concurrency} in flight)")
+        
+        if args.bulk_docs:
+            docs_per_sec = asyncio.run(bench_async_bulk(port, args.bulk_docs, args.concurrency))
+            logger.info(f"async bulk:   {docs_per_sec:,.0f} docs/s")
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    main()
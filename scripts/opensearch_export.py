@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""OpenSearch Export Script, dumps an index to NDJSON files"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from aws_analytics.services import OpenSearchService
+from aws_analytics.config import Settings
+from aws_analytics.utils import get_logger
+
+def main():
+    parser = argparse.ArgumentParser(description='Export an OpenSearch index to rotating NDJSON files')
+    parser.add_argument('-i', '--index', type=str, default=Settings.OPENSEARCH_INDEX or "test_aws_service",
+                       help='Index to export (default: OPENSEARCH_INDEX or test_aws_service)')
+    parser.add_argument('-o', '--output-dir', type=str, default='opensearch_export',
+                       help='Directory for NDJSON files (default: opensearch_export)')
+    parser.add_argument('-q', '--query', type=str,
+                       help='Search body as JSON, e.g. \'{"query": {"term": {"severity": "High"}}}\' (default: match_all)')
+    parser.add_argument('--iam', action='store_true',
+                       help='Sign requests with SigV4 instead of basic auth (default: OPENSEARCH_AUTH)')
+    parser.add_argument('-s', '--slices', type=int, default=4,
+                       help='Parallel sliced readers, one file series each (default: 4)')
+    parser.add_argument('-b', '--batch-size', type=int, default=1000,
+                       help='Hits per search page (default: 1000)')
+    parser.add_argument('--max-mb', type=float, default=128,
+                       help='Rotate files after this many MB (default: 128)')
+    parser.add_argument('--gzip', action='store_true',
+                       help='Gzip output files (default: false)')
+    
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+    
+    try:
+        opensearch = OpenSearchService(auth='iam' if args.iam else None)
+        query = json.loads(args.query) if args.query else None
+        
+        started = time.monotonic()
+        total = opensearch.export_ndjson(
+            args.index,
+            args.output_dir,
+            query=query,
+            slices=args.slices,
+            batch_size=args.batch_size,
+            max_bytes=int(args.max_mb * 1024 * 1024),
+            compress=args.gzip
+        )
+        elapsed = time.monotonic() - started
+        logger.info(f"Exported {total} documents in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} docs/s)")
+    
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
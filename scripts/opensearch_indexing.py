@@ -2,6 +2,8 @@
 """OpenSearch Indexing Script"""
 
 import sys
+import argparse
+from contextlib import ExitStack
 from pathlib import Path
 
 # Add src to path
@@ -15,9 +17,8 @@ import random
 import uuid
 
 def generate_aws_documents(num_docs=500):
-    """Generate sample AWS service documents"""
+    """Lazily generate sample AWS service documents"""
     tickers = ["EKS", "S3", "EC2", "RDS", "Lambda"]
-    documents = []
     
     for _ in range(num_docs):
         name = random.choice(tickers)
@@ -34,24 +35,52 @@ def generate_aws_documents(num_docs=500):
             "activity_name": "Update",
             "@timestamp": datetime.now(timezone.utc).isoformat()
         }
-        documents.append(document)
-    
-    return documents
+        yield document
 
 def main():
+    parser = argparse.ArgumentParser(description='Bulk index synthetic AWS service documents into OpenSearch')
+    parser.add_argument('-n', '--count', type=int, default=500,
+                       help='Number of documents to index (default: 500)')
+    parser.add_argument('-i', '--index', type=str, default=Settings.OPENSEARCH_INDEX or "test_aws_service",
+                       help='Target index (default: OPENSEARCH_INDEX or test_aws_service)')
+    parser.add_argument('--iam', action='store_true',
+                       help='Sign requests with SigV4 instead of basic auth (default: OPENSEARCH_AUTH)')
+    parser.add_argument('-w', '--workers', type=int, default=0,
+                       help='Concurrent bulk workers, 0 for a single streaming_bulk connection (default: 0)')
+    parser.add_argument('--chunk-size', type=int, default=500,
+                       help='Documents per bulk request (default: 500)')
+    parser.add_argument('--chunk-mb', type=float, default=10,
+                       help='Max bulk request size in MB (default: 10)')
+    parser.add_argument('--bulk-load-mode', action='store_true',
+                       help='Disable refresh and replicas while indexing, restore them afterwards (default: false)')
+    parser.add_argument('--force-merge', type=int,
+                       help='With --bulk-load-mode, force-merge to this many segments at the end (default: none)')
+    
+    args = parser.parse_args()
     logger = get_logger(__name__)
     
     try:
-        opensearch = OpenSearchService()
-        index_name = Settings.OPENSEARCH_INDEX or "test_aws_service"
+        opensearch = OpenSearchService(auth='iam' if args.iam else None)
+        index_name = args.index
         
-        # Generate documents
-        documents = generate_aws_documents(500)
-        logger.info(f"Generated {len(documents)} documents")
+        # Documents are generated as they are indexed
+        documents = generate_aws_documents(args.count)
+        max_chunk_bytes = int(args.chunk_mb * 1024 * 1024)
         
-        # Bulk index
-        opensearch.bulk_index(index_name, documents)
-        logger.info(f"Successfully indexed {len(documents)} documents to {index_name}")
+        with ExitStack() as stack:
+            if args.bulk_load_mode:
+                stack.enter_context(opensearch.bulk_load_mode(index_name, force_merge_segments=args.force_merge))
+            
+            if args.workers:
+                metrics = opensearch.parallel_bulk_index(index_name, documents, max_workers=args.workers,
+                                                         chunk_size=args.chunk_size, max_chunk_bytes=max_chunk_bytes)
+                logger.info(f"Indexed {metrics['docs']} documents to {index_name}: {metrics}")
+                return
+            
+            # Bulk index
+            success, failed, _ = opensearch.bulk_index(index_name, documents, chunk_size=args.chunk_size,
+                                                       max_chunk_bytes=max_chunk_bytes)
+            logger.info(f"Successfully indexed {success} documents to {index_name}, {failed} failed")
         
     except Exception as e:
         logger.error(f"Error: {e}")
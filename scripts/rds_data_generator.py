@@ -2,6 +2,7 @@
 """RDS Data Generator Script"""
 
 import sys
+import argparse
 from pathlib import Path
 
 # Add src to path
@@ -10,7 +11,31 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from aws_analytics.services import RDSService
 from aws_analytics.utils import get_logger
 
+def positive_int(value):
+    """argparse type for integers >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
 def main():
+    parser = argparse.ArgumentParser(description='Load random books into the RDS PostgreSQL books table')
+    parser.add_argument('-n', '--count', type=positive_int, default=1000,
+                       help='Number of books to insert (default: 1000)')
+    parser.add_argument('-w', '--workers', type=positive_int, default=1,
+                       help='Worker processes, each generating and loading its share on its own connection (default: 1)')
+    parser.add_argument('-m', '--method', type=str, default='copy', choices=['copy', 'values'],
+                       help='COPY FROM STDIN or multi-row INSERT (default: copy)')
+    parser.add_argument('--commit-every', type=int, default=10000,
+                       help='Rows per transaction (default: 10000)')
+    parser.add_argument('--page-size', type=int, default=1000,
+                       help='Rows per INSERT statement with --method values (default: 1000)')
+    parser.add_argument('--seed', type=int,
+                       help='Seed for reproducible rows (default: random)')
+    parser.add_argument('--sample', type=int, default=5,
+                       help='Sample records to show afterwards, 0 to skip (default: 5)')
+    
+    args = parser.parse_args()
     logger = get_logger(__name__)
     
     try:
@@ -22,18 +47,27 @@ def main():
         rds.create_books_table()
         
         # Insert data
-        num_records = int(input("Number of records to insert (default 1000): ").strip() or 1000)
-        rds.insert_random_books(num_records)
+        if args.workers > 1:
+            stats = rds.parallel_insert_random_books(args.count, num_workers=args.workers, method=args.method,
+                                                     page_size=args.page_size, commit_every=args.commit_every,
+                                                     seed=args.seed)
+        else:
+            stats = rds.insert_random_books(args.count, method=args.method, page_size=args.page_size,
+                                            commit_every=args.commit_every, seed=args.seed)
+        logger.info(f"Loaded {stats['rows']} rows in {stats['elapsed']:.1f}s ({stats['rows_per_sec']:.0f} rows/s, {stats['method']})")
         
         # Show sample data
-        logger.info("Sample records:")
-        books = rds.get_books(5)
-        for book in books:
-            logger.info(f"  {book['title']} by {book['author']} ({book['publication_year']})")
+        if args.sample:
+            logger.info("Sample records:")
+            books = rds.get_books(args.sample)
+            for book in books:
+                logger.info(f"  {book['title']} by {book['author']} ({book['publication_year']})")
         
+        rds.close()
+    
     except Exception as e:
         logger.error(f"Error: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
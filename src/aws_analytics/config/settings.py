@@ -11,21 +11,33 @@ class Settings:
     OPENSEARCH_USER = os.getenv("OPENSEARCH_USER")
     OPENSEARCH_PWD = os.getenv("OPENSEARCH_PWD")
     OPENSEARCH_INDEX = os.getenv("OPENSEARCH_INDEX")
+    OPENSEARCH_PORT = int(os.getenv("OPENSEARCH_PORT", "443"))
+    OPENSEARCH_AUTH = os.getenv("OPENSEARCH_AUTH", "basic")  # basic or iam
+    OPENSEARCH_SERVICE = os.getenv("OPENSEARCH_SERVICE", "es")  # es, or aoss for Serverless
+    OPENSEARCH_POOL_MAXSIZE = int(os.getenv("OPENSEARCH_POOL_MAXSIZE", "32"))
+    OPENSEARCH_VERIFY_CERTS = os.getenv("OPENSEARCH_VERIFY_CERTS", "true").lower() == "true"
     
     # MSK
     MSK_BS_IAM = os.getenv("MSK_BS_IAM")
     MSK_BOOTSTRAP_SERVERS = os.getenv("MSK_BOOTSTRAP_SERVERS")
     MSK_TOPIC = os.getenv("MSK_TOPIC")
+    MSK_AUTH = os.getenv("MSK_AUTH", "none")  # none or iam
     
     # Kinesis
     KDS_NAME = os.getenv("KDS_NAME")
     
+    # Firehose
+    FIREHOSE_STREAM_NAME = os.getenv("FIREHOSE_STREAM_NAME")
+    
     # RDS
     DB_NAME = os.getenv("DB_NAME")
     DB_USER = os.getenv("DB_USER")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
     DB_HOST = os.getenv("DB_HOST")
     DB_PORT = os.getenv("DB_PORT", "5432")
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # seconds before a connection is replaced
     
     # HTTP
     HTTP_URL = os.getenv("HTTP_URL")
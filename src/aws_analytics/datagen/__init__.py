@@ -0,0 +1,6 @@
+"""Vectorized synthetic event generation with NumPy"""
+from .batch import Categorical, EventBatch
+from .columns import uuid4_array, arrival_times_ms, iso_timestamps, prefixed_ids
+from .generators import DataGenerator
+
+__all__ = ["Categorical", "EventBatch", "DataGenerator", "uuid4_array", "arrival_times_ms", "iso_timestamps", "prefixed_ids"]
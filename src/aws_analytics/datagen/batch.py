@@ -0,0 +1,137 @@
+import json
+import numpy as np
+
+class Categorical:
+    """Column of small integer codes into a fixed list of values"""
+    
+    def __init__(self, codes, values):
+        self.codes = np.asarray(codes)
+        self.values = list(values)
+    
+    def __len__(self):
+        return len(self.codes)
+
+class EventBatch:
+    """Columnar batch of events, one array per field
+    
+    Columns are keyed by field name, with dotted names ('metadata.product.name')
+    for nested objects. A column is a NumPy int/float/bool
+    array, an 'S' array of ASCII strings that need no JSON escaping
+    (generated ids and timestamps), a Categorical, or a scalar shared by
+    every event. Fields come out in the order their names first appear, with
+    the fields of a nested object kept together.
+    """
+    
+    def __init__(self, columns):
+        self.columns = dict(columns)
+        # Put columns in tree order so value tuples line up with the template slots
+        self.columns = {name: self.columns[name] for name in self._leaves(self._tree())}
+        lengths = {len(column) for column in self.columns.values() if self._is_column(column)}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self._size = lengths.pop() if lengths else 0
+        self._template = None
+    
+    @staticmethod
+    def _is_column(column):
+        return isinstance(column, (np.ndarray, Categorical))
+    
+    def __len__(self):
+        return self._size
+    
+    def _tree(self):
+        """Field names grouped into nested dicts, leaves are the dotted column names"""
+        tree = {}
+        for name in self.columns:
+            node = tree
+            *parents, leaf = name.split('.')
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[leaf] = name
+        return tree
+    
+    def _leaves(self, tree):
+        """Dotted column names in the order the tree emits them"""
+        names = []
+        for node in tree.values():
+            names.extend(self._leaves(node) if isinstance(node, dict) else [node])
+        return names
+    
+    def _slot(self, name):
+        """Template fragment for one field, constants are inlined"""
+        column = self.columns[name]
+        if not self._is_column(column):
+            return json.dumps(column).replace('%', '%%').encode('utf-8')
+        if isinstance(column, Categorical):
+            return b'%s'
+        kind = column.dtype.kind
+        if kind == 'S':
+            return b'"%s"'
+        if kind in 'iu':
+            return b'%d'
+        if kind == 'f':
+            return b'%r'
+        if kind == 'b':
+            return b'%s'
+        raise ValueError(f"Unsupported column dtype for {name}: {column.dtype}")
+    
+    def _build_template(self, tree):
+        fields = []
+        for key, node in tree.items():
+            value = self._build_template(node) if isinstance(node, dict) else self._slot(node)
+            fields.append(json.dumps(key).replace('%', '%%').encode('utf-8') + b': ' + value)
+        return b'{' + b', '.join(fields) + b'}'
+    
+    def _encoded_values(self):
+        """Per-column Python lists ready for the bytes template"""
+        values = []
+        for name, column in self.columns.items():
+            if not self._is_column(column):
+                continue
+            if isinstance(column, Categorical):
+                fragments = np.array([json.dumps(value).encode('utf-8') for value in column.values], dtype=object)
+                values.append(fragments[column.codes].tolist())
+            elif column.dtype.kind == 'b':
+                values.append(np.where(column, b'true', b'false').tolist())
+            else:
+                values.append(column.tolist())
+        return values
+    
+    def encode(self):
+        """One JSON document (bytes) per event, identical to json.dumps of the matching record"""
+        if self._template is None:
+            self._template = self._build_template(self._tree())
+        values = self._encoded_values()
+        if not values:
+            return [self._template] * self._size
+        template = self._template
+        return [template % row for row in zip(*values)]
+    
+    def to_json_lines(self):
+        """Whole batch as newline-delimited JSON bytes"""
+        if not self._size:
+            return b''
+        return b'\n'.join(self.encode()) + b'\n'
+    
+    def _python_column(self, column):
+        if not self._is_column(column):
+            return [column] * self._size
+        if isinstance(column, Categorical):
+            return np.array(column.values, dtype=object)[column.codes].tolist()
+        if column.dtype.kind == 'S':
+            return column.astype('U').tolist()
+        return column.tolist()
+    
+    def records(self):
+        """Events as dicts, for services that take records one at a time"""
+        columns = {name: self._python_column(column) for name, column in self.columns.items()}
+        tree = self._tree()
+        
+        def build(node, i):
+            return {key: build(child, i) if isinstance(child, dict) else columns[child][i]
+                    for key, child in node.items()}
+        
+        if all(not isinstance(child, dict) for child in tree.values()):
+            keys = [key for key in tree]
+            return [dict(zip(keys, row)) for row in zip(*(columns[tree[key]] for key in keys))]
+        return [build(tree, i) for i in range(self._size)]
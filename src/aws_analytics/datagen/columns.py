@@ -0,0 +1,38 @@
+import numpy as np
+
+# Two lowercase hex digits for every byte value
+_HEX_PAIRS = np.array([b'%02x' % i for i in range(256)], dtype='S2')
+
+# Hex digit ranges of the five dash-separated UUID groups, and their offsets in the 36-char string
+_UUID_GROUPS = ((0, 8, 0), (8, 12, 9), (12, 16, 14), (16, 20, 19), (20, 32, 24))
+
+def uuid4_array(rng, n):
+    """n random (version 4) UUID strings as an 'S36' array, drawn from a NumPy Generator"""
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    
+    digits = _HEX_PAIRS[raw].view(np.uint8).reshape(n, 32)
+    out = np.full((n, 36), ord('-'), dtype=np.uint8)
+    for start, end, offset in _UUID_GROUPS:
+        out[:, offset:offset + end - start] = digits[:, start:end]
+    return out.view('S36').ravel()
+
+def arrival_times_ms(rng, n, start_ms, events_per_sec):
+    """Epoch millisecond timestamps of n Poisson arrivals after start_ms, returns (timestamps, next start_ms)"""
+    if not events_per_sec:
+        return np.full(n, int(start_ms), dtype=np.int64), start_ms
+    offsets = np.cumsum(rng.exponential(1000.0 / events_per_sec, size=n))
+    return (start_ms + offsets).astype(np.int64), start_ms + (offsets[-1] if n else 0.0)
+
+def iso_timestamps(timestamps_ms, unit='ms', utc=True):
+    """ISO 8601 strings ('S' array) for epoch millisecond timestamps, with a Z suffix when utc"""
+    values = np.asarray(timestamps_ms, dtype=np.int64).astype('datetime64[ms]')
+    return np.datetime_as_string(values, unit=unit, timezone='UTC' if utc else 'naive').astype('S')
+
+def prefixed_ids(prefix, numbers, width=0):
+    """Strings like 'CUST-1234' or 'client_007' ('S' array) for an integer array"""
+    digits = np.asarray(numbers).astype('S')
+    if width:
+        digits = np.char.zfill(digits, width)
+    return np.char.add(prefix.encode('ascii'), digits)
@@ -0,0 +1,97 @@
+import time
+import numpy as np
+from .batch import Categorical, EventBatch
+from .columns import uuid4_array, arrival_times_ms, iso_timestamps, prefixed_ids
+
+AWS_SERVICES = ["EKS", "S3", "EC2", "RDS", "Lambda"]
+PRODUCT_CATEGORIES = ['Electronics', 'Clothing', 'Books', 'Home', 'Sports']
+OPERATOR_NAMES = ["John Doe", "Jane Smith", "Bob Johnson", "Alice Brown"]
+ACTIONS = ["create", "modify", "delete", "view"]
+TARGET_TYPES = ["portfolio", "account", "transaction", "report"]
+
+class DataGenerator:
+    """Seedable columnar generator for the project's synthetic event shapes
+    
+    Each method returns an EventBatch of n events. Timestamps follow Poisson
+    arrivals at events_per_sec from start_ms (default now) and carry on
+    across batches, so a seed and a start_ms reproduce the same stream.
+    """
+    
+    KINDS = ('aws_documents', 'orders', 'compliance_events', 'load_messages')
+    
+    def __init__(self, seed=None, start_ms=None, events_per_sec=1000):
+        self.rng = np.random.default_rng(seed)
+        self.events_per_sec = events_per_sec
+        self.clock_ms = float(start_ms if start_ms is not None else time.time() * 1000)
+    
+    def _timestamps(self, n):
+        timestamps, self.clock_ms = arrival_times_ms(self.rng, n, self.clock_ms, self.events_per_sec)
+        return timestamps
+    
+    def _choice(self, values, n):
+        return Categorical(self.rng.integers(0, len(values), size=n, dtype=np.int8), values)
+    
+    def aws_documents(self, n):
+        """Sample AWS service documents, as in scripts/opensearch_indexing.py"""
+        timestamps = self._timestamps(n)
+        return EventBatch({
+            'id': uuid4_array(self.rng, n),
+            'metadata.product.name': self._choice(AWS_SERVICES, n),
+            'message': "ResponseComplete",
+            'time': timestamps,
+            'severity': "Informational",
+            'activity_name': "Update",
+            '@timestamp': iso_timestamps(timestamps)
+        })
+    
+    def orders(self, n):
+        """Sample order events, as in scripts/kds_producer.py"""
+        price = self.rng.integers(10, 501, size=n) + self.rng.integers(10, 100, size=n) / 100
+        return EventBatch({
+            'orderId': uuid4_array(self.rng, n),
+            'customerId': prefixed_ids('CUST-', self.rng.integers(1000, 10000, size=n)),
+            'productCategory': self._choice(PRODUCT_CATEGORIES, n),
+            'price': np.round(price, 2),
+            'quantity': self.rng.integers(1, 11, size=n),
+            'timestamp': iso_timestamps(self._timestamps(n), unit='us', utc=False)
+        })
+    
+    def compliance_events(self, n):
+        """Compliance events, as in scripts/putrecord_firehose.py"""
+        return EventBatch({
+            'event_id': uuid4_array(self.rng, n),
+            'operator_id': prefixed_ids('user_', self.rng.integers(100, 1000, size=n)),
+            'operator_name': self._choice(OPERATOR_NAMES, n),
+            'client_id': prefixed_ids('client_', self.rng.integers(1, 101, size=n), width=3),
+            'action': self._choice(ACTIONS, n),
+            'target_type': self._choice(TARGET_TYPES, n),
+            'timestamp': iso_timestamps(self._timestamps(n), unit='s'),
+            'amount': np.round(self.rng.uniform(1000, 50000, size=n), 2)
+        })
+    
+    def load_messages(self, n, thread_id=0, start_count=0):
+        """MSK load test messages, as sent by MSKService.generate_load"""
+        return EventBatch({
+            'timestamp': self._timestamps(n) / 1000.0,
+            'thread_id': thread_id,
+            'count': np.arange(start_count, start_count + n, dtype=np.int64)
+        })
+    
+    def batches(self, kind, total, batch_size=10000, **kwargs):
+        """EventBatches of one kind until total events are produced"""
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown event kind: {kind}")
+        make_batch = getattr(self, kind)
+        start_count = kwargs.pop('start_count', 0) if kind == 'load_messages' else None
+        produced = 0
+        while produced < total:
+            n = min(batch_size, total - produced)
+            if start_count is not None:
+                kwargs['start_count'] = start_count + produced
+            yield make_batch(n, **kwargs)
+            produced += n
+    
+    def records(self, kind, total, batch_size=10000, **kwargs):
+        """Lazily yield event dicts, generated batch_size at a time"""
+        for batch in self.batches(kind, total, batch_size, **kwargs):
+            yield from batch.records()
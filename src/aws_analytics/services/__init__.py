@@ -1,8 +1,11 @@
-from .msk_service import MSKService
+from .msk_service import MSKService, ProducerManager
+from .msk_consumer_service import MSKConsumerService
 from .opensearch_service import OpenSearchService
+from .opensearch_async_service import AsyncOpenSearchService
 from .kinesis_service import KinesisService
+from .firehose_service import FirehoseService
 from .rds_service import RDSService
 from .neptune_service import NeptuneService
 from .lakeformation_service import LakeFormationService
 
-__all__ = ["MSKService", "OpenSearchService", "KinesisService", "RDSService", "NeptuneService", "LakeFormationService"]
\ No newline at end of file
+__all__ = ["MSKService", "ProducerManager", "MSKConsumerService", "OpenSearchService", "AsyncOpenSearchService", "KinesisService", "FirehoseService", "RDSService", "NeptuneService", "LakeFormationService"]
\ No newline at end of file
@@ -0,0 +1,165 @@
+import boto3
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ..config import Settings
+from ..utils import get_logger, backoff_delay
+
+# PutRecordBatch API limits
+MAX_RECORDS_PER_BATCH = 500
+MAX_BYTES_PER_BATCH = 4 * 1024 * 1024
+MAX_RECORD_BYTES = 1000 * 1024
+
+RETRYABLE_ERRORS = ('ServiceUnavailableException', 'ThrottlingException', 'InternalFailure',
+                    'LimitExceededException')
+
+def encode_record(data):
+    """Newline-delimited bytes for a record, JSON-encoding data that is not already bytes/str"""
+    if isinstance(data, bytes):
+        return data if data.endswith(b'\n') else data + b'\n'
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    if not data.endswith('\n'):
+        data += '\n'
+    return data.encode('utf-8')
+
+def chunk_records(records, max_records=MAX_RECORDS_PER_BATCH, max_bytes=MAX_BYTES_PER_BATCH):
+    """Lazily pack records into PutRecordBatch-sized lists of encoded bytes"""
+    batch = []
+    batch_bytes = 0
+    
+    for record in records:
+        data = encode_record(record)
+        if len(data) > MAX_RECORD_BYTES:
+            raise ValueError(f"Record of {len(data)} bytes exceeds the {MAX_RECORD_BYTES} byte Firehose limit")
+        
+        if batch and (len(batch) >= max_records or batch_bytes + len(data) > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        
+        batch.append(data)
+        batch_bytes += len(data)
+    
+    if batch:
+        yield batch
+
+class FirehoseService:
+    """Kinesis Data Firehose service
+    
+    put_records() packs an iterable of records into newline-delimited
+    PutRecordBatch calls (500 records / 4 MiB), sends them concurrently on a
+    thread pool and re-sends only the entries a response marks as failed,
+    with jittered exponential backoff.
+    """
+    
+    def __init__(self, client=None, stream_name=None, max_workers=4, max_retries=5, base_backoff=0.1, max_backoff=5.0):
+        self.logger = get_logger(__name__)
+        self.client = client or boto3.client('firehose', region_name=Settings.AWS_REGION)
+        self.stream_name = stream_name or Settings.FIREHOSE_STREAM_NAME
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+    
+    def put_record(self, data):
+        """Put single record to the delivery stream"""
+        try:
+            response = self.client.put_record(DeliveryStreamName=self.stream_name, Record={'Data': encode_record(data)})
+            self.logger.info(f"Record sent: {response['RecordId']}")
+            return response
+        except Exception as e:
+            self.logger.error(f"Failed to put record: {e}")
+            raise
+    
+    def send_batch(self, batch, stats):
+        """Send one batch of encoded records, retrying failed entries, returns per-entry responses
+        
+        An exception on the first request is raised; one on a retry fails only
+        the entries still pending.
+        """
+        results = [None] * len(batch)
+        pending = list(range(len(batch)))
+        attempt = 0
+        
+        while pending:
+            gave_up = False
+            try:
+                response = self.client.put_record_batch(
+                    DeliveryStreamName=self.stream_name,
+                    Records=[{'Data': batch[i]} for i in pending]
+                )
+                responses = response['RequestResponses']
+            except Exception as e:
+                code = getattr(e, 'response', {}).get('Error', {}).get('Code', type(e).__name__)
+                if code not in RETRYABLE_ERRORS or attempt >= self.max_retries:
+                    if not attempt:
+                        raise
+                    # Entries delivered by earlier attempts keep their results, only the pending ones fail
+                    self.logger.error(f"Giving up on {len(pending)} records after {attempt + 1} attempts: {e}")
+                    gave_up = True
+                responses = [{'ErrorCode': code, 'ErrorMessage': str(e)}] * len(pending)
+            
+            with self._lock:
+                stats['requests'] += 1
+            
+            retry = []
+            for index, result in zip(pending, responses):
+                results[index] = result
+                if 'ErrorCode' in result:
+                    retry.append(index)
+            
+            if not retry or gave_up or attempt >= self.max_retries:
+                break
+            
+            attempt += 1
+            with self._lock:
+                stats['retries'] += len(retry)
+            time.sleep(backoff_delay(attempt - 1, self.base_backoff, self.max_backoff))
+            pending = retry
+        
+        sent_bytes = sum(len(data) for data, result in zip(batch, results) if 'ErrorCode' not in result)
+        failed = sum(1 for result in results if 'ErrorCode' in result)
+        with self._lock:
+            stats['records'] += len(batch) - failed
+            stats['failed'] += failed
+            stats['bytes'] += sent_bytes
+        if failed:
+            error = next(result for result in results if 'ErrorCode' in result)
+            self.logger.error(f"{failed} records failed after retries: {error['ErrorCode']}")
+        return results
+    
+    def put_records(self, records):
+        """Send an iterable of records in parallel batches, returns throughput stats
+        
+        At most two batches per worker are built ahead of the senders, so
+        memory stays flat for generators of any length.
+        """
+        stats = {'records': 0, 'failed': 0, 'bytes': 0, 'requests': 0, 'retries': 0}
+        started = time.monotonic()
+        in_flight = set()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for batch in chunk_records(records):
+                    if len(in_flight) >= self.max_workers * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    in_flight.add(executor.submit(self.send_batch, batch, stats))
+                
+                for future in in_flight:
+                    future.result()
+        except Exception as e:
+            self.logger.error(f"Failed to put records: {e}")
+            raise
+        
+        elapsed = time.monotonic() - started
+        stats['elapsed'] = elapsed
+        stats['records_per_sec'] = stats['records'] / elapsed if elapsed > 0 else 0
+        stats['bytes_per_sec'] = stats['bytes'] / elapsed if elapsed > 0 else 0
+        self.logger.info(f"Sent {stats['records']} records ({stats['records_per_sec']:.0f}/s, "
+                         f"{stats['bytes_per_sec'] / 1024 / 1024:.2f} MB/s), {stats['failed']} failed")
+        return stats
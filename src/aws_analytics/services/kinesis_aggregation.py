@@ -0,0 +1,296 @@
+import hashlib
+
+# KPL aggregated record format: magic + AggregatedRecord protobuf + MD5(protobuf)
+#
+#   message AggregatedRecord {
+#     repeated string partition_key_table     = 1;
+#     repeated string explicit_hash_key_table = 2;
+#     repeated Record records                 = 3;
+#   }
+#   message Record {
+#     required uint64 partition_key_index     = 1;
+#     optional uint64 explicit_hash_key_index = 2;
+#     required bytes  data                    = 3;
+#     repeated Tag    tags                    = 4;
+#   }
+KPL_MAGIC = b'\xf3\x89\x9a\xc2'
+DIGEST_SIZE = 16
+MAX_RECORD_BYTES = 1024 * 1024
+
+def _varint(value):
+    """Protobuf base-128 varint"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _length_delimited(field_number, payload):
+    """Protobuf wire type 2 field"""
+    return _varint((field_number << 3) | 2) + _varint(len(payload)) + payload
+
+def _uint_field(field_number, value):
+    """Protobuf wire type 0 field"""
+    return _varint(field_number << 3) + _varint(value)
+
+def _read_varint(buffer, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+def _read_fields(buffer):
+    """Yield (field_number, value) for a protobuf message, skipping fixed-width fields"""
+    pos = 0
+    end = len(buffer)
+    while pos < end:
+        key, pos = _read_varint(buffer, pos)
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type == 0:
+            value, pos = _read_varint(buffer, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(buffer, pos)
+            value = buffer[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            pos += 8
+            continue
+        elif wire_type == 5:
+            pos += 4
+            continue
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field_number, value
+
+class RecordAggregator:
+    """Packs user records into one KPL-format aggregated record
+    
+    The aggregated record takes the partition key of its first user record and,
+    if set, the explicit hash key of its first user record. Add only records
+    bound for the same shard; AggregatingBuffer groups them that way.
+    """
+    
+    def __init__(self, max_bytes=MAX_RECORD_BYTES):
+        self.max_bytes = max_bytes
+        self.reset()
+    
+    def reset(self):
+        """Drop buffered user records"""
+        self._partition_keys = {}
+        self._hash_keys = {}
+        self._records = []
+        self._size = len(KPL_MAGIC) + DIGEST_SIZE
+        self.partition_key = None
+        self.explicit_hash_key = None
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def _record_cost(self, data, partition_key, explicit_hash_key):
+        """Bytes that adding this user record would add"""
+        cost = 0
+        pk_index = self._partition_keys.get(partition_key)
+        if pk_index is None:
+            pk_index = len(self._partition_keys)
+            cost += len(_length_delimited(1, partition_key.encode('utf-8')))
+        
+        record = _uint_field(1, pk_index)
+        if explicit_hash_key is not None:
+            ehk_index = self._hash_keys.get(explicit_hash_key)
+            if ehk_index is None:
+                ehk_index = len(self._hash_keys)
+                cost += len(_length_delimited(2, explicit_hash_key.encode('utf-8')))
+            record += _uint_field(2, ehk_index)
+        record += _length_delimited(3, data)
+        
+        cost += len(_length_delimited(3, record))
+        if not self._records:
+            # The aggregated record's own partition key counts against the 1 MiB limit
+            cost += len(partition_key.encode('utf-8'))
+        return cost
+    
+    def fits(self, data, partition_key, explicit_hash_key=None):
+        """Whether the user record fits without exceeding max_bytes"""
+        return self._size + self._record_cost(data, partition_key, explicit_hash_key) <= self.max_bytes
+    
+    def add(self, data, partition_key, explicit_hash_key=None):
+        """Add a user record, raises ValueError if it does not fit
+        
+        The first record may use the whole plain-record limit: a lone record
+        is sent unaggregated, so the aggregation overhead does not apply.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        cost = self._record_cost(data, partition_key, explicit_hash_key)
+        if self._size + cost > self.max_bytes:
+            plain_size = len(data) + len(partition_key.encode('utf-8'))
+            if self._records or plain_size > self.max_bytes:
+                raise ValueError("User record does not fit in the aggregated record")
+        
+        if not self._records:
+            self.partition_key = partition_key
+            self.explicit_hash_key = explicit_hash_key
+        
+        if partition_key not in self._partition_keys:
+            self._partition_keys[partition_key] = len(self._partition_keys)
+        if explicit_hash_key is not None and explicit_hash_key not in self._hash_keys:
+            self._hash_keys[explicit_hash_key] = len(self._hash_keys)
+        
+        self._records.append((data, partition_key, explicit_hash_key))
+        self._size += cost
+    
+    def serialize(self):
+        """Encoded aggregated record bytes"""
+        parts = [_length_delimited(1, key.encode('utf-8')) for key in self._partition_keys]
+        parts.extend(_length_delimited(2, key.encode('utf-8')) for key in self._hash_keys)
+        
+        for data, partition_key, explicit_hash_key in self._records:
+            record = _uint_field(1, self._partition_keys[partition_key])
+            if explicit_hash_key is not None:
+                record += _uint_field(2, self._hash_keys[explicit_hash_key])
+            record += _length_delimited(3, data)
+            parts.append(_length_delimited(3, record))
+        
+        message = b''.join(parts)
+        return KPL_MAGIC + message + hashlib.md5(message).digest()
+    
+    def to_entry(self):
+        """PutRecords entry for the aggregated record, then reset"""
+        if not self._records:
+            return None
+        
+        if len(self._records) == 1:
+            # A single user record is sent as-is, like the KPL does
+            data, partition_key, explicit_hash_key = self._records[0]
+        else:
+            data, partition_key, explicit_hash_key = self.serialize(), self.partition_key, self.explicit_hash_key
+        
+        entry = {'Data': data, 'PartitionKey': partition_key}
+        if explicit_hash_key is not None:
+            entry['ExplicitHashKey'] = explicit_hash_key
+        self.reset()
+        return entry
+
+class AggregatingBuffer:
+    """Per-group record aggregators that emit full aggregated PutRecords entries
+    
+    group_key(partition_key, explicit_hash_key) chooses which aggregated record
+    a user record joins. By default records are grouped by the shard a
+    shard_map predicts for them, like the KPL: every user record in an
+    aggregate then hashes to that shard, so the aggregate, routed by its
+    first record's keys, lands there too and per-key order is kept. Without
+    a shard map (or when the lookup fails) records are grouped by explicit
+    hash key, else by partition key.
+    """
+    
+    def __init__(self, max_bytes=MAX_RECORD_BYTES, group_key=None, shard_map=None):
+        self.max_bytes = max_bytes
+        self.shard_map = shard_map
+        self.group_key = group_key or self._shard_group
+        self._aggregators = {}
+    
+    def _shard_group(self, partition_key, explicit_hash_key):
+        """Predicted shard id, or the key the record is routed by"""
+        if self.shard_map is not None:
+            try:
+                shard = self.shard_map.shard_for_key(partition_key, explicit_hash_key)
+            except Exception:
+                shard = None
+            if shard is not None:
+                return ('shard', shard['ShardId'])
+        if explicit_hash_key is not None:
+            return ('hash_key', explicit_hash_key)
+        return ('partition_key', partition_key)
+    
+    def __len__(self):
+        return sum(len(aggregator) for aggregator in self._aggregators.values())
+    
+    def add(self, data, partition_key, explicit_hash_key=None):
+        """Add a user record, returns a finished aggregated entry when its group filled up"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        key = self.group_key(partition_key, explicit_hash_key)
+        aggregator = self._aggregators.get(key)
+        if aggregator is None:
+            aggregator = self._aggregators[key] = RecordAggregator(self.max_bytes)
+        
+        finished = None
+        if len(aggregator) and not aggregator.fits(data, partition_key, explicit_hash_key):
+            finished = aggregator.to_entry()
+        aggregator.add(data, partition_key, explicit_hash_key)
+        return finished
+    
+    def flush(self):
+        """Finished entries for every non-empty group"""
+        entries = [aggregator.to_entry() for aggregator in self._aggregators.values() if len(aggregator)]
+        self._aggregators = {}
+        return entries
+
+def aggregate_entries(entries, max_bytes=MAX_RECORD_BYTES, group_key=None, shard_map=None):
+    """Aggregate PutRecords entries into KPL aggregated entries"""
+    buffer = AggregatingBuffer(max_bytes, group_key, shard_map)
+    for entry in entries:
+        finished = buffer.add(entry['Data'], entry['PartitionKey'], entry.get('ExplicitHashKey'))
+        if finished is not None:
+            yield finished
+    yield from buffer.flush()
+
+def deaggregate_record(record):
+    """Split a get_records record into its user records
+    
+    Non-aggregated records and records whose MD5 does not match are returned
+    unchanged. User records keep the parent's SequenceNumber and get a
+    SubSequenceNumber, like the KCL.
+    """
+    data = record['Data']
+    if not data.startswith(KPL_MAGIC) or len(data) < len(KPL_MAGIC) + DIGEST_SIZE:
+        return [record]
+    
+    message = data[len(KPL_MAGIC):-DIGEST_SIZE]
+    if hashlib.md5(message).digest() != data[-DIGEST_SIZE:]:
+        return [record]
+    
+    partition_keys = []
+    hash_keys = []
+    raw_records = []
+    for field_number, value in _read_fields(message):
+        if field_number == 1:
+            partition_keys.append(value.decode('utf-8'))
+        elif field_number == 2:
+            hash_keys.append(value.decode('utf-8'))
+        elif field_number == 3:
+            raw_records.append(value)
+    
+    user_records = []
+    for sub_sequence, raw in enumerate(raw_records):
+        fields = {}
+        for field_number, value in _read_fields(raw):
+            fields[field_number] = value
+        
+        user_record = dict(record)
+        user_record['Data'] = bytes(fields[3])
+        user_record['PartitionKey'] = partition_keys[fields[1]]
+        if 2 in fields:
+            user_record['ExplicitHashKey'] = hash_keys[fields[2]]
+        user_record['SubSequenceNumber'] = sub_sequence
+        user_records.append(user_record)
+    
+    return user_records
+
+def deaggregate_records(records):
+    """Flatten get_records records into user records"""
+    user_records = []
+    for record in records:
+        user_records.extend(deaggregate_record(record))
+    return user_records
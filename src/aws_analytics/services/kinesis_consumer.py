@@ -0,0 +1,278 @@
+import sqlite3
+import threading
+import time
+from ..utils import backoff_delay
+from .kinesis_aggregation import deaggregate_records
+
+class SQLiteCheckpointStore:
+    """Per-shard sequence number checkpoints for one stream in a local SQLite file
+    
+    A row exists once a shard has been started; finished marks shards that
+    were read to their end after a split or merge.
+    """
+    
+    def __init__(self, path, stream_name):
+        self.path = path
+        self.stream_name = stream_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kinesis_checkpoints ("
+            "stream_name TEXT NOT NULL, shard_id TEXT NOT NULL, sequence_number TEXT, "
+            "finished INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (stream_name, shard_id))"
+        )
+        self._conn.commit()
+    
+    def get(self, shard_id):
+        """(sequence_number, finished) for a shard, None if it was never started"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sequence_number, finished FROM kinesis_checkpoints WHERE stream_name = ? AND shard_id = ?",
+                (self.stream_name, shard_id)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], bool(row[1])
+    
+    def _upsert(self, sql, params):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+    
+    def start(self, shard_id):
+        """Record that a shard is being read"""
+        self._upsert(
+            "INSERT OR IGNORE INTO kinesis_checkpoints (stream_name, shard_id, updated_at) VALUES (?, ?, ?)",
+            (self.stream_name, shard_id, time.time())
+        )
+    
+    def checkpoint(self, shard_id, sequence_number):
+        """Store the last processed sequence number of a shard"""
+        self._upsert(
+            "INSERT INTO kinesis_checkpoints (stream_name, shard_id, sequence_number, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (stream_name, shard_id) DO UPDATE SET sequence_number = excluded.sequence_number, "
+            "updated_at = excluded.updated_at",
+            (self.stream_name, shard_id, sequence_number, time.time())
+        )
+    
+    def finish(self, shard_id):
+        """Mark a closed shard as fully read"""
+        self._upsert(
+            "INSERT INTO kinesis_checkpoints (stream_name, shard_id, finished, updated_at) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT (stream_name, shard_id) DO UPDATE SET finished = 1, updated_at = excluded.updated_at",
+            (self.stream_name, shard_id, time.time())
+        )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class KinesisShardConsumer:
+    """Consumer that reads every shard of a stream concurrently, one thread per shard
+    
+    Shards resume after their checkpointed sequence number. Child shards from a
+    split or merge start once all their parents are read to the end, so per
+    partition key ordering holds across resharding. Each shard polls again
+    after min_poll_interval while it is behind (MillisBehindLatest > 0) and
+    backs off towards max_poll_interval once caught up. Aggregated (KPL)
+    records are handed to handler as individual user records with a ShardId.
+    """
+    
+    def __init__(self, service, handler, checkpoint_store, initial_position='LATEST', limit=10000,
+                 min_poll_interval=0.2, max_poll_interval=2.0, shard_sync_interval=30, report_interval=30):
+        self.service = service
+        self.logger = service.logger
+        self.client = service.client
+        self.stream_name = service.stream_name
+        self.handler = handler
+        self.checkpoints = checkpoint_store
+        self.initial_position = initial_position
+        self.limit = limit
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.shard_sync_interval = shard_sync_interval
+        self.report_interval = report_interval
+        self._stop_event = threading.Event()
+        self._shards_changed = threading.Event()
+        self._lock = threading.Lock()
+        self._error = None
+        self._workers = {}
+        self._finished = set()
+        self._behind = {}
+        self._processed_count = 0
+        self._started_at = None
+    
+    def stop(self):
+        """Ask every shard worker to stop after its current batch"""
+        self._stop_event.set()
+        self._shards_changed.set()
+    
+    def _is_done(self, shard):
+        """Whether a shard needs no (more) reading"""
+        shard_id = shard['ShardId']
+        if shard_id in self._finished:
+            return True
+        state = self.checkpoints.get(shard_id)
+        if state is not None and state[1]:
+            self._finished.add(shard_id)
+            return True
+        closed = 'EndingSequenceNumber' in shard.get('SequenceNumberRange', {})
+        # Starting at LATEST skips whatever already sits in closed shards
+        return closed and state is None and self.initial_position == 'LATEST'
+    
+    def _ready_shards(self, shards):
+        """Shards that should be read now: not done, not running, all parents done"""
+        by_id = {shard['ShardId']: shard for shard in shards}
+        ready = []
+        for shard in shards:
+            if shard['ShardId'] in self._workers or self._is_done(shard):
+                continue
+            parents = [shard.get('ParentShardId'), shard.get('AdjacentParentShardId')]
+            # Parents past the retention period are no longer listed
+            if all(parent not in by_id or self._is_done(by_id[parent]) for parent in parents if parent):
+                ready.append(shard)
+        return ready
+    
+    def _shard_iterator(self, shard):
+        """Iterator after the checkpoint, at a child's start or at initial_position"""
+        shard_id = shard['ShardId']
+        state = self.checkpoints.get(shard_id)
+        params = {'StreamName': self.stream_name, 'ShardId': shard_id}
+        
+        if state is not None and state[0]:
+            params.update(ShardIteratorType='AFTER_SEQUENCE_NUMBER', StartingSequenceNumber=state[0])
+        elif any(parent and self.checkpoints.get(parent) is not None
+                 for parent in (shard.get('ParentShardId'), shard.get('AdjacentParentShardId'))):
+            # We read the parents, so read the child from its first record
+            params['ShardIteratorType'] = 'TRIM_HORIZON'
+        else:
+            params['ShardIteratorType'] = self.initial_position
+        
+        self.checkpoints.start(shard_id)
+        return self.client.get_shard_iterator(**params)['ShardIterator']
+    
+    def _poll_delay(self, millis_behind, record_count):
+        """Poll fast while behind, slow down once caught up"""
+        if millis_behind > 0 or record_count >= self.limit:
+            return self.min_poll_interval
+        return self.max_poll_interval
+    
+    def _consume_shard(self, shard):
+        """Read one shard until it ends or the consumer stops"""
+        shard_id = shard['ShardId']
+        attempt = 0
+        try:
+            iterator = self._shard_iterator(shard)
+            while iterator and not self._stop_event.is_set():
+                try:
+                    response = self.client.get_records(ShardIterator=iterator, Limit=self.limit)
+                except Exception as e:
+                    code = getattr(e, 'response', {}).get('Error', {}).get('Code', type(e).__name__)
+                    if code == 'ExpiredIteratorException':
+                        iterator = self._shard_iterator(shard)
+                        continue
+                    if code in ('ProvisionedThroughputExceededException', 'KMSThrottlingException'):
+                        self._stop_event.wait(backoff_delay(attempt, self.min_poll_interval, self.max_poll_interval * 5))
+                        attempt += 1
+                        continue
+                    raise
+                attempt = 0
+                
+                records = response['Records']
+                user_records = deaggregate_records(records)
+                for record in user_records:
+                    record['ShardId'] = shard_id
+                    self.handler(record)
+                
+                if records:
+                    self.checkpoints.checkpoint(shard_id, records[-1]['SequenceNumber'])
+                
+                millis_behind = response.get('MillisBehindLatest', 0)
+                with self._lock:
+                    self._processed_count += len(user_records)
+                    self._behind[shard_id] = millis_behind
+                
+                iterator = response.get('NextShardIterator')
+                if iterator:
+                    self._stop_event.wait(self._poll_delay(millis_behind, len(records)))
+            
+            if not iterator:
+                # Closed shard read to the end, its children can start
+                self.checkpoints.finish(shard_id)
+                # Children of a split or merge are only listed after a fresh read
+                self.service.shard_map.invalidate()
+                with self._lock:
+                    self._finished.add(shard_id)
+                    self._behind.pop(shard_id, None)
+                self.logger.info(f"Shard {shard_id} finished")
+        except Exception as e:
+            self.logger.error(f"Shard {shard_id} consumer failed: {e}")
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+            self._stop_event.set()
+        finally:
+            with self._lock:
+                self._workers.pop(shard_id, None)
+            self._shards_changed.set()
+    
+    def _start_ready_shards(self):
+        shards = self.service.list_shards()
+        for shard in self._ready_shards(shards):
+            worker = threading.Thread(target=self._consume_shard, args=(shard,), daemon=True)
+            with self._lock:
+                self._workers[shard['ShardId']] = worker
+            worker.start()
+            self.logger.info(f"Started consumer for shard {shard['ShardId']}")
+    
+    def run(self, stop_event=None):
+        """Consume until stopped, returns final metrics, re-raises a worker failure"""
+        self._started_at = time.monotonic()
+        last_sync = last_report = time.monotonic()
+        self._start_ready_shards()
+        
+        try:
+            while not self._stop_event.is_set():
+                if stop_event is not None and stop_event.is_set():
+                    break
+                
+                self._shards_changed.wait(1.0)
+                now = time.monotonic()
+                if self._shards_changed.is_set() or now - last_sync >= self.shard_sync_interval:
+                    self._shards_changed.clear()
+                    self._start_ready_shards()
+                    last_sync = now
+                
+                if self.report_interval and now - last_report >= self.report_interval:
+                    self._log_metrics()
+                    last_report = now
+        finally:
+            self._stop_event.set()
+            with self._lock:
+                workers = list(self._workers.values())
+            for worker in workers:
+                worker.join()
+        
+        if self._error is not None:
+            raise self._error
+        return self.metrics()
+    
+    def metrics(self):
+        """Throughput, active shards and per-shard MillisBehindLatest"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        with self._lock:
+            return {
+                'records': self._processed_count,
+                'records_per_sec': self._processed_count / elapsed if elapsed > 0 else 0,
+                'active_shards': sorted(self._workers),
+                'finished_shards': sorted(self._finished),
+                'millis_behind': dict(self._behind)
+            }
+    
+    def _log_metrics(self):
+        metrics = self.metrics()
+        behind = max(metrics['millis_behind'].values(), default=0)
+        self.logger.info(f"Consumed {metrics['records']} records ({metrics['records_per_sec']:.1f}/s) "
+                         f"from {len(metrics['active_shards'])} shards, max {behind} ms behind")
@@ -0,0 +1,86 @@
+import itertools
+import threading
+import uuid
+
+class RandomPartitioner:
+    """Random partition key per record, spreads load evenly over all shards"""
+    
+    def __call__(self, data):
+        return uuid.uuid4().hex, None
+
+class FieldHashPartitioner:
+    """Partition key from a record field (e.g. customerId), keeps per-key ordering
+    
+    Records missing the field get a random key.
+    """
+    
+    def __init__(self, field):
+        self.field = field
+    
+    def __call__(self, data):
+        value = data.get(self.field) if isinstance(data, dict) else None
+        if value is None:
+            return uuid.uuid4().hex, None
+        return str(value), None
+
+class ShardRoundRobinPartitioner:
+    """Cycles records over open shards by setting ExplicitHashKey inside each shard's range
+    
+    shard_source is a callable returning list_shards-style shard dicts, such as
+    ShardMap.open_shards. The hash ranges are rebuilt whenever it returns a
+    different list (the shard map refreshed) or after refresh().
+    """
+    
+    def __init__(self, shard_source):
+        self.shard_source = shard_source
+        self._lock = threading.Lock()
+        self._shards = None
+        self._cycle = None
+    
+    def refresh(self):
+        """Reload shard hash ranges on next use"""
+        with self._lock:
+            self._shards = None
+            self._cycle = None
+    
+    def _hash_keys(self, shards):
+        keys = []
+        for shard in shards:
+            if shard.get('SequenceNumberRange', {}).get('EndingSequenceNumber'):
+                # Closed parent shard, no longer accepts writes
+                continue
+            hash_range = shard['HashKeyRange']
+            start, end = int(hash_range['StartingHashKey']), int(hash_range['EndingHashKey'])
+            keys.append(str((start + end) // 2))
+        if not keys:
+            raise ValueError("No open shards to partition over")
+        return keys
+    
+    def __call__(self, data):
+        shards = self.shard_source()
+        with self._lock:
+            if self._cycle is None or shards is not self._shards:
+                self._cycle = itertools.cycle(self._hash_keys(shards))
+                self._shards = shards
+            explicit_hash_key = next(self._cycle)
+        # PartitionKey is still required but ignored for routing
+        return explicit_hash_key, explicit_hash_key
+
+def get_partitioner(name, field=None, shard_source=None):
+    """Build a partitioner by name (random, field or round-robin), callables pass through
+    
+    A partitioner maps a record to (partition_key, explicit_hash_key).
+    """
+    if callable(name):
+        return name
+    if name == 'random':
+        return RandomPartitioner()
+    if name == 'field':
+        if not field:
+            raise ValueError("Field partitioner needs a field name")
+        return FieldHashPartitioner(field)
+    if name == 'round-robin':
+        if shard_source is None:
+            raise ValueError("Round-robin partitioner needs a shard source")
+        return ShardRoundRobinPartitioner(shard_source)
+    raise ValueError(f"Unknown partitioner: {name}. Available: random, field, round-robin")
@@ -0,0 +1,308 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from ..utils import get_logger, backoff_delay
+from .kinesis_aggregation import AggregatingBuffer
+from .kinesis_partitioners import get_partitioner
+
+# PutRecords API limits
+MAX_RECORDS_PER_REQUEST = 500
+MAX_BYTES_PER_REQUEST = 5 * 1024 * 1024
+MAX_RECORD_BYTES = 1024 * 1024
+
+RETRYABLE_ERRORS = ('ProvisionedThroughputExceededException', 'InternalFailure', 'ServiceUnavailable',
+                    'ThrottlingException', 'LimitExceededException', 'KMSThrottlingException')
+
+def make_entry(data, partition_key, explicit_hash_key=None):
+    """Build a PutRecords entry, JSON-encoding data that is not already bytes/str"""
+    if not isinstance(data, (bytes, str)):
+        data = json.dumps(data)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    
+    entry = {'Data': data, 'PartitionKey': partition_key}
+    if explicit_hash_key is not None:
+        entry['ExplicitHashKey'] = explicit_hash_key
+    return entry
+
+def entry_size(entry):
+    """Bytes an entry counts against the request and record limits"""
+    return len(entry['Data']) + len(entry['PartitionKey'].encode('utf-8'))
+
+def chunk_entries(entries, max_records=MAX_RECORDS_PER_REQUEST, max_bytes=MAX_BYTES_PER_REQUEST):
+    """Split entries into PutRecords-sized chunks by count and bytes"""
+    chunk = []
+    chunk_bytes = 0
+    
+    for entry in entries:
+        size = entry_size(entry)
+        if size > MAX_RECORD_BYTES:
+            raise ValueError(f"Record of {size} bytes exceeds the {MAX_RECORD_BYTES} byte Kinesis limit")
+        
+        if chunk and (len(chunk) >= max_records or chunk_bytes + size > max_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        
+        chunk.append(entry)
+        chunk_bytes += size
+    
+    if chunk:
+        yield chunk
+
+class KinesisBatchProducer:
+    """Buffered PutRecords producer with API-limit chunking and partial-failure retry
+    
+    put() buffers entries and ships a chunk as soon as a full request's worth
+    (500 records or 5 MiB) is buffered, or once the oldest buffered entry is
+    linger_ms old. Chunks are sent concurrently on a thread pool; only the
+    entries a response marks as failed are re-sent, with jittered exponential
+    backoff, up to max_retries times. At most max_in_flight chunks (default
+    twice max_workers) are queued or sending; put() blocks beyond that.
+    
+    With aggregate=True, user records are first packed into KPL aggregated
+    records (grouped by predicted shard via shard_map, or by group_key, see
+    AggregatingBuffer) so many small events share one Kinesis record.
+    
+    Records put without a partition key are keyed by partitioner (a name for
+    get_partitioner or a callable), and shard_counts tracks records accepted
+    per shard. Given a shard_map, a response naming an unknown shard or a
+    throughput error triggers a background shard map refresh.
+    """
+    
+    def __init__(self, client, stream_name, max_workers=4, linger_ms=200, max_retries=5, base_backoff=0.1,
+                 max_backoff=5.0, on_failure=None, aggregate=False, group_key=None,
+                 partitioner='random', shard_map=None, max_in_flight=None):
+        self.logger = get_logger(__name__)
+        self.client = client
+        self.stream_name = stream_name
+        self.linger_ms = linger_ms
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.on_failure = on_failure
+        self.partitioner = get_partitioner(partitioner)
+        self.shard_map = shard_map
+        self.stats = {'records': 0, 'failed': 0, 'retries': 0, 'requests': 0, 'bytes': 0}
+        self.shard_counts = Counter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.RLock()
+        self._slot_freed = threading.Condition(self._lock)
+        self.max_in_flight = max_in_flight or max_workers * 2
+        self._in_flight = 0
+        self._waiting = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._pending_since = None
+        self._aggregator = AggregatingBuffer(group_key=group_key, shard_map=shard_map) if aggregate else None
+        self._futures = set()
+        self._closed = threading.Event()
+        self._linger_thread = None
+        
+        if linger_ms:
+            self._linger_thread = threading.Thread(target=self._linger, daemon=True)
+            self._linger_thread.start()
+    
+    def put(self, data, partition_key=None, explicit_hash_key=None):
+        """Buffer one record for sending, keyed by the partitioner when no partition key is given"""
+        if partition_key is None:
+            partition_key, partition_hash_key = self.partitioner(data)
+            explicit_hash_key = explicit_hash_key or partition_hash_key
+        self.put_entry(make_entry(data, partition_key, explicit_hash_key))
+    
+    def put_entry(self, entry):
+        """Buffer a prepared PutRecords entry"""
+        size = entry_size(entry)
+        if size > MAX_RECORD_BYTES:
+            raise ValueError(f"Record of {size} bytes exceeds the {MAX_RECORD_BYTES} byte Kinesis limit")
+        
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("Producer is closed")
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            
+            if self._aggregator is None:
+                self._buffer_entry(entry)
+                return
+            
+            finished = self._aggregator.add(entry['Data'], entry['PartitionKey'], entry.get('ExplicitHashKey'))
+            if finished is not None:
+                self._buffer_entry(finished)
+    
+    def _buffer_entry(self, entry):
+        """Append to the request buffer, shipping it first if it is full, caller holds the lock"""
+        size = entry_size(entry)
+        # Other threads may refill the buffer while a submit waits for a slot, so check again
+        while self._buffer and (len(self._buffer) >= MAX_RECORDS_PER_REQUEST
+                                or self._buffer_bytes + size > MAX_BYTES_PER_REQUEST):
+            self._submit_buffer()
+        self._buffer.append(entry)
+        self._buffer_bytes += size
+    
+    def _flush_pending(self):
+        """Ship aggregated and buffered records, caller holds the lock"""
+        self._pending_since = None
+        if self._aggregator is not None:
+            for entry in self._aggregator.flush():
+                self._buffer_entry(entry)
+        if self._buffer:
+            self._submit_buffer()
+    
+    def _submit_buffer(self):
+        """Hand the buffered chunk to the pool once a slot is free, caller holds the lock
+        
+        Waiting releases the lock, so senders can still update stats.
+        """
+        chunk, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        self._waiting += 1
+        try:
+            while self._in_flight >= self.max_in_flight:
+                self._slot_freed.wait()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        future = self._executor.submit(self._send_and_report, chunk)
+        self._futures.add(future)
+        future.add_done_callback(self._forget_future)
+    
+    def _forget_future(self, future):
+        with self._lock:
+            self._futures.discard(future)
+            self._in_flight -= 1
+            self._slot_freed.notify_all()
+    
+    def _linger(self):
+        """Flush the buffer once its oldest entry has waited linger_ms"""
+        interval = self.linger_ms / 1000
+        while not self._closed.wait(interval / 2):
+            with self._lock:
+                if self._pending_since is not None and time.monotonic() - self._pending_since >= interval:
+                    self._flush_pending()
+    
+    def _chunk_failed(self, chunk, e):
+        """Per-entry error results for a chunk whose first request raised"""
+        self.logger.error(f"Failed to put {len(chunk)} records: {e}")
+        with self._lock:
+            self.stats['failed'] += len(chunk)
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code', type(e).__name__)
+        return [{'ErrorCode': code, 'ErrorMessage': str(e)}] * len(chunk)
+    
+    def _send_and_report(self, chunk):
+        """Send a chunk from the pool and report entries that still failed"""
+        try:
+            results = self.send_chunk(chunk)
+        except Exception as e:
+            results = self._chunk_failed(chunk, e)
+        
+        failed = [(entry, result) for entry, result in zip(chunk, results) if 'ErrorCode' in result]
+        if failed:
+            if self.on_failure:
+                self.on_failure(failed)
+            else:
+                self.logger.error(f"{len(failed)} records failed after retries: {failed[0][1]['ErrorCode']}")
+        return results
+    
+    def send_chunk(self, entries):
+        """Send one request-sized chunk, re-sending failed entries with backoff
+        
+        Returns per-entry results in input order. An exception on the first
+        request is raised; one on a retry fails only the entries still pending.
+        """
+        results = [None] * len(entries)
+        pending = list(range(len(entries)))
+        attempt = 0
+        
+        while pending:
+            batch = [entries[i] for i in pending]
+            try:
+                response = self.client.put_records(StreamName=self.stream_name, Records=batch)
+                records = response['Records']
+            except Exception as e:
+                code = getattr(e, 'response', {}).get('Error', {}).get('Code', type(e).__name__)
+                if code not in RETRYABLE_ERRORS or attempt >= self.max_retries:
+                    if not attempt:
+                        raise
+                    # Entries sent by earlier attempts keep their results, only the pending ones fail
+                    self.logger.error(f"Giving up on {len(batch)} records after {attempt + 1} attempts: {e}")
+                records = [{'ErrorCode': code, 'ErrorMessage': str(e)}] * len(batch)
+            
+            with self._lock:
+                self.stats['requests'] += 1
+            if self.shard_map is not None:
+                self._check_shard_map(records)
+            
+            retry = []
+            for index, record in zip(pending, records):
+                results[index] = record
+                if 'ErrorCode' in record and record['ErrorCode'] in RETRYABLE_ERRORS:
+                    retry.append(index)
+            
+            if not retry or attempt >= self.max_retries:
+                break
+            
+            attempt += 1
+            with self._lock:
+                self.stats['retries'] += len(retry)
+            time.sleep(backoff_delay(attempt - 1, self.base_backoff, self.max_backoff))
+            pending = retry
+        
+        sent = [entry for entry, result in zip(entries, results) if 'ErrorCode' not in result]
+        with self._lock:
+            self.shard_counts.update(result['ShardId'] for result in results if 'ShardId' in result)
+            self.stats['records'] += len(sent)
+            self.stats['failed'] += len(entries) - len(sent)
+            self.stats['bytes'] += sum(entry_size(entry) for entry in sent)
+        return results
+    
+    def _check_shard_map(self, records):
+        """Refresh the shard map in the background when a response hints at resharding"""
+        for record in records:
+            shard_id = record.get('ShardId')
+            unknown_shard = shard_id is not None and not self.shard_map.knows(shard_id)
+            if unknown_shard or record.get('ErrorCode') == 'ProvisionedThroughputExceededException':
+                self.shard_map.refresh_async()
+                return
+    
+    def send_batch(self, entries):
+        """Chunk entries, send chunks concurrently and wait, returns per-entry results in order
+        
+        A chunk whose request raised gets an error result per entry, so the
+        other chunks' results are still returned.
+        """
+        chunks = list(chunk_entries(entries))
+        futures = [self._executor.submit(self.send_chunk, chunk) for chunk in chunks]
+        
+        results = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                results.extend(self._chunk_failed(chunk, e))
+        return results
+    
+    def flush(self, timeout=None):
+        """Send everything buffered and wait for in-flight chunks"""
+        with self._lock:
+            self._flush_pending()
+            # Chunks other threads are still waiting to submit
+            while self._waiting:
+                self._slot_freed.wait()
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+    
+    def close(self, timeout=None):
+        """Flush and stop the producer"""
+        self.flush(timeout=timeout)
+        self._closed.set()
+        if self._linger_thread is not None:
+            self._linger_thread.join()
+        self._executor.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
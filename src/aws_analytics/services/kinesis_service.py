@@ -1,74 +1,136 @@
 import boto3
 import json
 import time
+from collections import Counter
 from ..config import Settings
 from ..utils import get_logger
+from .kinesis_producer import KinesisBatchProducer, make_entry
+from .kinesis_aggregation import aggregate_entries, deaggregate_records
+from .kinesis_partitioners import get_partitioner
+from .kinesis_consumer import KinesisShardConsumer, SQLiteCheckpointStore
+from .kinesis_shard_map import ShardMap
 
 class KinesisService:
-    """Kinesis Data Streams service"""
+    """Kinesis Data Streams service
     
-    def __init__(self):
+    partitioner picks partition keys for records sent without one: 'random'
+    (default), 'field' with partition_field (e.g. customerId) or 'round-robin'
+    over the stream's open shards via ExplicitHashKey. A callable returning
+    (partition_key, explicit_hash_key) also works.
+    
+    Shard listings and the stream description are cached for shard_map_ttl
+    seconds and shared by the partitioner, producers and consumers.
+    """
+    
+    def __init__(self, client=None, stream_name=None, partitioner='random', partition_field=None, shard_map_ttl=300):
         self.logger = get_logger(__name__)
-        self.client = boto3.client('kinesis', region_name=Settings.AWS_REGION)
-        self.stream_name = Settings.KDS_NAME
+        self.client = client or boto3.client('kinesis', region_name=Settings.AWS_REGION)
+        self.stream_name = stream_name or Settings.KDS_NAME
+        self.shard_map = ShardMap(self.client, self.stream_name, ttl=shard_map_ttl)
+        self.partitioner = get_partitioner(partitioner, field=partition_field, shard_source=self.shard_map.open_shards)
+        self.shard_counts = Counter()
+        self._description = None
+        self._description_at = 0
+        self._batch_producer = None
         
-    def put_record(self, data, partition_key=None):
+    def put_record(self, data, partition_key=None, explicit_hash_key=None):
         """Put single record to stream"""
         if not partition_key:
-            partition_key = str(int(time.time()))
+            partition_key, partition_hash_key = self.partitioner(data)
+            explicit_hash_key = explicit_hash_key or partition_hash_key
+        
+        params = {'StreamName': self.stream_name, 'Data': json.dumps(data), 'PartitionKey': partition_key}
+        if explicit_hash_key is not None:
+            params['ExplicitHashKey'] = explicit_hash_key
             
         try:
-            response = self.client.put_record(
-                StreamName=self.stream_name,
-                Data=json.dumps(data),
-                PartitionKey=partition_key
-            )
+            response = self.client.put_record(**params)
+            self.shard_counts[response['ShardId']] += 1
             self.logger.info(f"Record sent: {response['SequenceNumber']}")
             return response
         except Exception as e:
             self.logger.error(f"Failed to put record: {e}")
             raise
     
-    def put_records(self, records):
-        """Put multiple records to stream"""
-        kinesis_records = []
+    def put_records(self, records, aggregate=False):
+        """Put multiple records to stream, chunked to the API limits with failed entries retried
         
-        for i, record in enumerate(records):
-            kinesis_records.append({
-                'Data': json.dumps(record),
-                'PartitionKey': str(i)
-            })
+        With aggregate=True records are packed into KPL aggregated records, and
+        the returned results are per aggregated record.
+        """
+        entries = [make_entry(record, *self.partitioner(record)) for record in records]
+        if aggregate:
+            entries = list(aggregate_entries(entries, shard_map=self.shard_map))
         
         try:
-            response = self.client.put_records(
-                Records=kinesis_records,
-                StreamName=self.stream_name
-            )
+            results = self.batch_producer().send_batch(entries)
+            failed_count = sum(1 for result in results if 'ErrorCode' in result)
             
-            failed_count = response['FailedRecordCount']
-            success_count = len(records) - failed_count
-            
-            self.logger.info(f"Sent {success_count} records, {failed_count} failed")
-            return response
+            self.logger.info(f"Sent {len(entries) - failed_count} records, {failed_count} failed")
+            return {'FailedRecordCount': failed_count, 'Records': results}
             
         except Exception as e:
             self.logger.error(f"Failed to put records: {e}")
             raise
     
-    def describe_stream(self):
-        """Get stream information"""
+    def batch_producer(self, **kwargs):
+        """Shared buffered batch producer, or a new one when options are given"""
+        if kwargs:
+            kwargs.setdefault('partitioner', self.partitioner)
+            kwargs.setdefault('shard_map', self.shard_map)
+            return KinesisBatchProducer(self.client, self.stream_name, **kwargs)
+        if self._batch_producer is None:
+            self._batch_producer = KinesisBatchProducer(self.client, self.stream_name, partitioner=self.partitioner,
+                                                        shard_map=self.shard_map)
+        return self._batch_producer
+    
+    def shard_distribution(self):
+        """Records accepted per shard by put_record and the shared batch producer"""
+        counts = Counter(self.shard_counts)
+        if self._batch_producer is not None:
+            counts.update(self._batch_producer.shard_counts)
+        return dict(sorted(counts.items()))
+    
+    def close(self):
+        """Flush and stop the shared batch producer"""
+        if self._batch_producer is not None:
+            self._batch_producer.close()
+            self.shard_counts.update(self._batch_producer.shard_counts)
+            self._batch_producer = None
+    
+    def shard_consumer(self, handler, checkpoint_path='kinesis_checkpoints.db', **kwargs):
+        """Per-shard concurrent consumer checkpointing to a SQLite file"""
+        store = SQLiteCheckpointStore(checkpoint_path, self.stream_name)
+        return KinesisShardConsumer(self, handler, store, **kwargs)
+    
+    def consume(self, handler, checkpoint_path='kinesis_checkpoints.db', stop_event=None, **kwargs):
+        """Consume every shard with handler(record) until stopped, resuming from checkpoints"""
+        consumer = self.shard_consumer(handler, checkpoint_path, **kwargs)
+        try:
+            return consumer.run(stop_event=stop_event)
+        finally:
+            consumer.checkpoints.close()
+    
+    def describe_stream(self, refresh=False):
+        """Get stream information, cached for the shard map TTL"""
+        if not refresh and self._description is not None and time.monotonic() - self._description_at < self.shard_map.ttl:
+            return self._description
         try:
             response = self.client.describe_stream(StreamName=self.stream_name)
-            return response['StreamDescription']
+            self._description = response['StreamDescription']
+            self._description_at = time.monotonic()
+            return self._description
         except Exception as e:
             self.logger.error(f"Failed to describe stream: {e}")
             raise
     
-    def list_shards(self):
-        """List stream shards"""
-        try:
-            response = self.client.list_shards(StreamName=self.stream_name)
-            return response['Shards']
-        except Exception as e:
-            self.logger.error(f"Failed to list shards: {e}")
-            raise
\ No newline at end of file
+    def list_shards(self, refresh=False):
+        """List stream shards from the shard map cache"""
+        if refresh:
+            return self.shard_map.refresh()
+        return self.shard_map.shards()
+    
+    @staticmethod
+    def deaggregate(records):
+        """Expand KPL aggregated records from get_records into user records"""
+        return deaggregate_records(records)
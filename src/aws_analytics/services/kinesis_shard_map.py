@@ -0,0 +1,127 @@
+import bisect
+import hashlib
+import threading
+import time
+from ..utils import get_logger
+
+def partition_key_hash(partition_key):
+    """128-bit hash key Kinesis derives from a partition key"""
+    return int(hashlib.md5(partition_key.encode('utf-8')).hexdigest(), 16)
+
+class ShardMap:
+    """TTL-cached, fully paginated shard list of a stream with hash-key lookups
+    
+    shards() serves the cached list until ttl seconds have passed, so producers
+    and consumers share one list_shards call per TTL. Open shards are indexed
+    by starting hash key for O(log n) key -> shard lookups. refresh_async()
+    reloads in the background at most once per min_refresh_interval, for
+    callers that saw a sign of resharding.
+    """
+    
+    def __init__(self, client, stream_name, ttl=300, min_refresh_interval=5):
+        self.logger = get_logger(__name__)
+        self.client = client
+        self.stream_name = stream_name
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._lock = threading.Lock()
+        self._shards = None
+        self._open_shards = []
+        self._starts = []
+        self._shard_ids = frozenset()
+        self._loaded_at = 0
+        self._refreshing = False
+    
+    def _list_all(self):
+        """Every shard of the stream, following NextToken pages"""
+        response = self.client.list_shards(StreamName=self.stream_name)
+        shards = response['Shards']
+        while response.get('NextToken'):
+            # NextToken identifies the stream, StreamName must not be repeated
+            response = self.client.list_shards(NextToken=response['NextToken'])
+            shards.extend(response['Shards'])
+        return shards
+    
+    def refresh(self):
+        """Reload the shard list now"""
+        try:
+            shards = self._list_all()
+        except Exception as e:
+            self.logger.error(f"Failed to list shards: {e}")
+            raise
+        
+        open_shards = [shard for shard in shards
+                       if 'EndingSequenceNumber' not in shard.get('SequenceNumberRange', {})]
+        open_shards.sort(key=lambda shard: int(shard['HashKeyRange']['StartingHashKey']))
+        
+        with self._lock:
+            self._shards = shards
+            self._open_shards = open_shards
+            self._starts = [int(shard['HashKeyRange']['StartingHashKey']) for shard in open_shards]
+            self._shard_ids = frozenset(shard['ShardId'] for shard in shards)
+            self._loaded_at = time.monotonic()
+        return shards
+    
+    def invalidate(self):
+        """Drop the cache, the next read lists shards again"""
+        with self._lock:
+            self._loaded_at = 0
+    
+    def _expired(self):
+        return self._shards is None or time.monotonic() - self._loaded_at >= self.ttl
+    
+    def refresh_async(self):
+        """Reload in a background thread unless one ran within min_refresh_interval"""
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._loaded_at < self.min_refresh_interval:
+                return
+            self._refreshing = True
+        
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing = False
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def shards(self):
+        """All shards, open and closed; the same list object until the next refresh"""
+        with self._lock:
+            expired = self._expired()
+        if expired:
+            self.refresh()
+        with self._lock:
+            return self._shards
+    
+    def open_shards(self):
+        """Shards still accepting writes, sorted by hash range"""
+        self.shards()
+        with self._lock:
+            return self._open_shards
+    
+    def knows(self, shard_id):
+        """Whether a shard id is in the cached map"""
+        with self._lock:
+            return shard_id in self._shard_ids
+    
+    def shard_for_hash_key(self, hash_key):
+        """Open shard whose hash range contains an explicit hash key"""
+        self.shards()
+        with self._lock:
+            index = bisect.bisect_right(self._starts, int(hash_key)) - 1
+            if index < 0:
+                return None
+            shard = self._open_shards[index]
+        if int(hash_key) > int(shard['HashKeyRange']['EndingHashKey']):
+            return None
+        return shard
+    
+    def shard_for_key(self, partition_key, explicit_hash_key=None):
+        """Open shard a record with this partition key (or explicit hash key) is routed to"""
+        if explicit_hash_key is not None:
+            return self.shard_for_hash_key(explicit_hash_key)
+        return self.shard_for_hash_key(partition_key_hash(partition_key))
@@ -0,0 +1,429 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from kafka import KafkaConsumer, OffsetAndMetadata, ConsumerRebalanceListener
+from ..config import Settings
+from ..utils import get_logger
+from ..utils.msk_auth import msk_auth_config
+from ..utils.ndjson import RotatingNDJSONWriter
+
+def safe_deserialize(value):
+    """Deserialize JSON message values, falling back to text"""
+    if not value:
+        return None
+    try:
+        return json.loads(value.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return value.decode('utf-8', errors='ignore')
+
+def record_to_dict(message):
+    """Plain dict for a consumed Kafka record"""
+    return {
+        'topic': message.topic,
+        'partition': message.partition,
+        'offset': message.offset,
+        'timestamp': message.timestamp,
+        'key': message.key.decode('utf-8', errors='ignore') if message.key else None,
+        'value': message.value
+    }
+
+def offset_and_metadata(offset):
+    """OffsetAndMetadata across kafka-python versions (leader_epoch added in 2.1)"""
+    try:
+        return OffsetAndMetadata(offset, '', -1)
+    except TypeError:
+        return OffsetAndMetadata(offset, '')
+
+class OffsetTracker:
+    """Per-partition dispatched/completed offsets for in-order commits
+    
+    Offsets are tracked in dispatch order rather than by arithmetic, so gaps
+    from compacted or transactional topics do not block the commit point.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._completed = {}
+        self._committable = {}
+        self._processed = {}
+    
+    def dispatched(self, tp, offset):
+        """Record an offset handed to a worker"""
+        with self._lock:
+            self._pending.setdefault(tp, deque()).append(offset)
+            self._completed.setdefault(tp, set())
+    
+    def completed(self, tp, offset):
+        """Record a processed offset and advance the contiguous commit point"""
+        with self._lock:
+            pending = self._pending.get(tp)
+            if pending is None:
+                return
+            done = self._completed[tp]
+            done.add(offset)
+            while pending and pending[0] in done:
+                head = pending.popleft()
+                done.discard(head)
+                self._committable[tp] = head + 1
+                self._processed[tp] = head
+    
+    def pending(self, tp):
+        """Offsets dispatched but not yet committable"""
+        with self._lock:
+            return len(self._pending.get(tp, ()))
+    
+    def processed(self):
+        """Highest contiguous processed offset per partition"""
+        with self._lock:
+            return dict(self._processed)
+    
+    def take_committable(self, partitions=None):
+        """Pop the commit points that advanced since the last call"""
+        with self._lock:
+            if partitions is None:
+                offsets, self._committable = self._committable, {}
+                return offsets
+            return {tp: self._committable.pop(tp) for tp in partitions if tp in self._committable}
+    
+    def forget(self, partitions):
+        """Drop state for revoked partitions"""
+        with self._lock:
+            for tp in partitions:
+                self._pending.pop(tp, None)
+                self._completed.pop(tp, None)
+                self._committable.pop(tp, None)
+                self._processed.pop(tp, None)
+
+class _RevokeListener(ConsumerRebalanceListener):
+    """Drain and commit partitions before they move to another consumer"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+    
+    def on_partitions_revoked(self, revoked):
+        self.engine._drain_and_commit(revoked)
+    
+    def on_partitions_assigned(self, assigned):
+        pass
+
+class PartitionParallelConsumer:
+    """Batch-polling consumer that fans records out to a worker pool by partition
+    
+    Every partition is pinned to one worker thread, so records of a partition
+    are handled in order while partitions run in parallel. The poll thread
+    commits the highest contiguous processed offset per partition, pauses
+    partitions whose backlog exceeds max_pending_per_partition, and tracks
+    throughput and per-partition lag. On revoke it waits for the partition's
+    queued records to finish; records still queued when that times out are
+    dropped, since the partition now belongs to another group member.
+    """
+    
+    def __init__(self, service, handler, num_workers=4, max_pending_per_partition=1000, commit_interval=5.0,
+                 poll_timeout_ms=500, report_interval=30):
+        self.service = service
+        self.logger = service.logger
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_pending_per_partition = max_pending_per_partition
+        self.commit_interval = commit_interval
+        self.poll_timeout_ms = poll_timeout_ms
+        self.report_interval = report_interval
+        self.tracker = OffsetTracker()
+        self._queues = [queue.Queue() for _ in range(num_workers)]
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._error = None
+        self._consumer = None
+        self._paused = set()
+        self._owners = {}
+        self._epochs = {}
+        self._processed_count = 0
+        self._started_at = None
+        self._lag = {}
+    
+    def _worker_for(self, tp):
+        """Worker index that owns a partition, new partitions go to the least loaded worker"""
+        worker = self._owners.get(tp)
+        if worker is None:
+            loads = [0] * self.num_workers
+            for owner in self._owners.values():
+                loads[owner] += 1
+            worker = loads.index(min(loads))
+            self._owners[tp] = worker
+        return worker
+    
+    def _work(self, work_queue):
+        """Handle records in arrival order until the stop sentinel"""
+        while True:
+            item = work_queue.get()
+            if item is None:
+                return
+            tp, epoch, message = item
+            if self._error is not None:
+                # Stop handling after a failure so nothing past it gets committed or reprocessed out of order
+                continue
+            if epoch != self._epochs.get(tp, 0):
+                # Queued before the partition was revoked, its new owner handles it
+                continue
+            
+            try:
+                self.handler(message)
+            except Exception as e:
+                self.logger.error(f"Handler failed at {tp.topic}-{tp.partition}@{message.offset}: {e}")
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+                self._stop_event.set()
+                continue
+            
+            self.tracker.completed(tp, message.offset)
+            with self._lock:
+                self._processed_count += 1
+    
+    def stop(self):
+        """Ask the poll loop to stop after the current batch"""
+        self._stop_event.set()
+    
+    def run(self, stop_event=None):
+        """Consume until stopped, returns final metrics, re-raises a handler failure"""
+        consumer = self.service.create_consumer(subscribe=False)
+        consumer.subscribe(topics=self.service.topics, listener=_RevokeListener(self))
+        self._consumer = consumer
+        self._started_at = time.monotonic()
+        
+        workers = [threading.Thread(target=self._work, args=(q,), daemon=True) for q in self._queues]
+        for worker in workers:
+            worker.start()
+        
+        last_commit = last_report = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                if stop_event is not None and stop_event.is_set():
+                    break
+                
+                batches = consumer.poll(timeout_ms=self.poll_timeout_ms)
+                
+                for tp, records in batches.items():
+                    work_queue = self._queues[self._worker_for(tp)]
+                    epoch = self._epochs.get(tp, 0)
+                    for message in records:
+                        self.tracker.dispatched(tp, message.offset)
+                        work_queue.put((tp, epoch, message))
+                
+                self._apply_backpressure(consumer)
+                
+                now = time.monotonic()
+                if now - last_commit >= self.commit_interval:
+                    self._commit(consumer)
+                    self._update_lag(consumer)
+                    last_commit = now
+                
+                if self.report_interval and now - last_report >= self.report_interval:
+                    self._log_metrics()
+                    last_report = now
+        finally:
+            for work_queue in self._queues:
+                work_queue.put(None)
+            for worker in workers:
+                worker.join()
+            
+            self._commit(consumer)
+            self._update_lag(consumer)
+            consumer.close(autocommit=False)
+        
+        if self._error is not None:
+            raise self._error
+        return self.metrics()
+    
+    def _apply_backpressure(self, consumer):
+        """Pause partitions with a deep backlog, resume them once half drained"""
+        for tp in consumer.assignment():
+            pending = self.tracker.pending(tp)
+            if tp not in self._paused and pending >= self.max_pending_per_partition:
+                consumer.pause(tp)
+                self._paused.add(tp)
+            elif tp in self._paused and pending <= self.max_pending_per_partition // 2:
+                consumer.resume(tp)
+                self._paused.discard(tp)
+    
+    def _commit(self, consumer, partitions=None):
+        """Commit advanced contiguous offsets"""
+        offsets = self.tracker.take_committable(partitions)
+        if not offsets:
+            return
+        
+        try:
+            consumer.commit({tp: offset_and_metadata(offset) for tp, offset in offsets.items()})
+        except Exception as e:
+            self.logger.error(f"Offset commit failed: {e}")
+    
+    def _drain_and_commit(self, partitions, timeout=30):
+        """Wait for in-flight records of partitions to finish, then commit and forget them
+        
+        Records still queued after timeout are dropped by the workers.
+        """
+        deadline = time.monotonic() + timeout
+        while any(self.tracker.pending(tp) for tp in partitions) and time.monotonic() < deadline:
+            if self._stop_event.wait(0.05):
+                break
+        
+        left = sum(self.tracker.pending(tp) for tp in partitions)
+        if left:
+            self.logger.warning(f"Revoked partitions not drained in {timeout}s, dropping {left} queued records")
+        # Bumping the epoch makes workers skip everything queued so far for these partitions
+        for tp in partitions:
+            self._epochs[tp] = self._epochs.get(tp, 0) + 1
+        
+        self._commit(self._consumer, partitions)
+        self.tracker.forget(partitions)
+        self._paused.difference_update(partitions)
+        for tp in partitions:
+            self._owners.pop(tp, None)
+    
+    def _update_lag(self, consumer):
+        """Snapshot highwater and lag per partition from the poll thread"""
+        processed = self.tracker.processed()
+        lag = {}
+        for tp in consumer.assignment():
+            highwater = consumer.highwater(tp)
+            last = processed.get(tp)
+            lag[tp] = {
+                'highwater': highwater,
+                'processed_offset': last,
+                'pending': self.tracker.pending(tp),
+                'lag': highwater - (last + 1 if last is not None else 0) if highwater is not None else None
+            }
+        with self._lock:
+            self._lag = lag
+    
+    def metrics(self):
+        """Processed count, throughput and per-partition lag"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        with self._lock:
+            processed = self._processed_count
+            partitions = {f"{tp.topic}-{tp.partition}": dict(info) for tp, info in self._lag.items()}
+        
+        return {
+            'processed': processed,
+            'elapsed_sec': elapsed,
+            'records_per_sec': processed / elapsed if elapsed else 0.0,
+            'total_lag': sum(info['lag'] or 0 for info in partitions.values()),
+            'partitions': partitions
+        }
+    
+    def _log_metrics(self):
+        """Log throughput and total lag"""
+        metrics = self.metrics()
+        self.logger.info(
+            f"Processed {metrics['processed']} records, {metrics['records_per_sec']:.0f} rec/sec, "
+            f"lag {metrics['total_lag']} across {len(metrics['partitions'])} partitions"
+        )
+
+class MSKConsumerService:
+    """MSK consumer service for batch consumption with manual offset commits"""
+    
+    def __init__(self, topics, group_id='aws-analytics-consumer', consumer_factory=KafkaConsumer, auth=None,
+                 **consumer_config):
+        self.logger = get_logger(__name__)
+        self.topics = [topics] if isinstance(topics, str) else list(topics)
+        self.group_id = group_id
+        self.auth = (auth or Settings.MSK_AUTH or 'none').lower()
+        self.bootstrap_servers = Settings.MSK_BS_IAM if self.auth == 'iam' else Settings.MSK_BOOTSTRAP_SERVERS
+        self.consumer_factory = consumer_factory
+        self.consumer_config = consumer_config
+    
+    def _consumer_config(self, **kwargs):
+        """Build consumer config from defaults and overrides"""
+        config = {
+            'bootstrap_servers': self.bootstrap_servers.split(',') if self.bootstrap_servers else None,
+            'group_id': self.group_id,
+            'auto_offset_reset': 'earliest',
+            'enable_auto_commit': False,
+            'value_deserializer': safe_deserialize,
+            'max_poll_records': 500
+        }
+        config.update(msk_auth_config(self.auth))
+        config.update(self.consumer_config)
+        config.update(kwargs)
+        return config
+    
+    def create_consumer(self, subscribe=True, **kwargs):
+        """Create Kafka consumer, subscribed to the service topics unless subscribe is False"""
+        topics = self.topics if subscribe else []
+        return self.consumer_factory(*topics, **self._consumer_config(**kwargs))
+    
+    def parallel_consumer(self, handler, num_workers=4, **kwargs):
+        """Build a PartitionParallelConsumer calling handler(message) per record"""
+        return PartitionParallelConsumer(self, handler, num_workers=num_workers, **kwargs)
+    
+    def consume_parallel(self, handler, num_workers=4, stop_event=None, **kwargs):
+        """Consume with partition-pinned workers until stopped, returns final metrics"""
+        return self.parallel_consumer(handler, num_workers=num_workers, **kwargs).run(stop_event=stop_event)
+    
+    def consume_to_ndjson(self, directory, prefix=None, max_bytes=128 * 1024 * 1024, max_seconds=300,
+                          compress=False, print_records=False, poll_timeout_ms=1000, max_messages=None,
+                          stop_event=None):
+        """Stream records to rotating NDJSON files with constant memory
+        
+        Records are written as each poll() batch arrives. Segments only rotate
+        between batches, and offsets are committed right after a segment has
+        been fsynced, so every committed offset is backed by a finished file.
+        Only the offsets of records actually written are committed, also when
+        consumption stops on an error. Runs until stop_event is set,
+        max_messages is reached or interrupted.
+        """
+        stop_event = stop_event or threading.Event()
+        writer = RotatingNDJSONWriter(
+            directory,
+            prefix=prefix or self.topics[0].replace('.', '_'),
+            max_bytes=max_bytes,
+            max_seconds=max_seconds,
+            compress=compress
+        )
+        consumer = self.create_consumer()
+        written = {}
+        total = 0
+        
+        self.logger.info(f"Consuming {', '.join(self.topics)} into {directory}")
+        
+        try:
+            while not stop_event.is_set():
+                batches = consumer.poll(timeout_ms=poll_timeout_ms)
+                
+                for tp, records in batches.items():
+                    for message in records:
+                        record = record_to_dict(message)
+                        writer.write(record)
+                        written[tp] = message.offset
+                        total += 1
+                        
+                        if print_records:
+                            print(json.dumps(record, ensure_ascii=False, default=str))
+                
+                if writer.should_rotate():
+                    self._rotate_and_commit(writer, consumer, written)
+                
+                if max_messages and total >= max_messages:
+                    break
+        finally:
+            try:
+                self._rotate_and_commit(writer, consumer, written)
+            finally:
+                consumer.close(autocommit=False)
+        
+        self.logger.info(f"Consumed {total} records into {len(writer.segments)} files")
+        return {'records': total, 'files': list(writer.segments)}
+    
+    def _rotate_and_commit(self, writer, consumer, written):
+        """Finish the open segment, then commit the offsets of the records written to it"""
+        records = writer.segment_records
+        path = writer.rotate()
+        if path is None or not written:
+            return
+        
+        consumer.commit({tp: offset_and_metadata(offset + 1) for tp, offset in written.items()})
+        written.clear()
+        self.logger.info(f"Wrote {records} records to {path}, offsets committed")
@@ -1,76 +1,597 @@
-import json
+import atexit
+import multiprocessing
+import os
+import queue
 import threading
 import time
 from kafka import KafkaProducer
+from kafka import codec as kafka_codec
+from kafka.errors import KafkaTimeoutError
 from ..config import Settings
-from ..utils import get_logger
+from ..utils import get_logger, LatencyHistogram, TokenBucket
+from ..utils.msk_auth import msk_auth_config
+from ..utils.serialization import get_serializer, available_serializers, LOAD_MESSAGE_SCHEMA
+
+# Compression codec name -> (availability check, encoder used for benchmarking)
+COMPRESSION_CODECS = {
+    'none': (lambda: True, lambda data: data),
+    'gzip': (kafka_codec.has_gzip, kafka_codec.gzip_encode),
+    'snappy': (kafka_codec.has_snappy, kafka_codec.snappy_encode),
+    'lz4': (kafka_codec.has_lz4, kafka_codec.lz4_encode),
+    'zstd': (kafka_codec.has_zstd, kafka_codec.zstd_encode)
+}
+
+def compression_type(compression):
+    """Validate a codec name and map it to the producer compression_type"""
+    name = compression or 'none'
+    if name not in COMPRESSION_CODECS:
+        raise ValueError(f"Unknown compression codec: {name}. Available: {', '.join(COMPRESSION_CODECS)}")
+    if not COMPRESSION_CODECS[name][0]():
+        raise ValueError(f"Compression codec {name} requires its library to be installed (python-snappy, lz4, zstandard)")
+    return None if name == 'none' else name
+
+def available_codecs():
+    """Codec names whose libraries are installed"""
+    return [name for name, (available, _) in COMPRESSION_CODECS.items() if available()]
+
+class PooledProducer:
+    """Long-lived Kafka producer with a bounded number of in-flight sends"""
+    
+    def __init__(self, producer, max_in_flight=10000):
+        self.producer = producer
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+    
+    @property
+    def in_flight(self):
+        """Number of sends not yet acked or failed"""
+        return self._in_flight
+    
+    def send_async(self, topic, value=None, key=None, timeout=None):
+        """Queue a message without waiting for the ack, returns the send future"""
+        if not self._slots.acquire(timeout=timeout):
+            raise KafkaTimeoutError(f"Timed out waiting for one of {self.max_in_flight} in-flight slots")
+        
+        with self._lock:
+            self._in_flight += 1
+        
+        try:
+            future = self.producer.send(topic, value=value, key=key)
+        except Exception:
+            self._release(None)
+            raise
+        
+        future.add_both(self._release)
+        return future
+    
+    def _release(self, _):
+        """Free an in-flight slot once a send completes"""
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+    
+    def flush(self, timeout=None):
+        """Block until all buffered messages are sent"""
+        self.producer.flush(timeout=timeout)
+    
+    def close(self, timeout=None):
+        """Flush and close the underlying producer"""
+        self.producer.close(timeout=timeout)
+
+class ProducerManager:
+    """Process-wide, thread-safe cache of long-lived producers keyed by config"""
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_in_flight=10000):
+        self.logger = get_logger(__name__)
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._producers = {}
+        self._pid = os.getpid()
+    
+    @classmethod
+    def instance(cls):
+        """Get the shared manager for this process"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+                    atexit.register(cls._instance.close)
+        return cls._instance
+    
+    @staticmethod
+    def _config_key(config, factory):
+        """Build a hashable key from a producer config"""
+        items = []
+        for name, value in sorted(config.items()):
+            if not isinstance(value, (str, int, float, bool, type(None))):
+                value = repr(value)
+            items.append((name, value))
+        return (repr(factory), tuple(items))
+    
+    def get(self, config, factory=KafkaProducer):
+        """Get or create the producer for this config"""
+        key = self._config_key(config, factory)
+        
+        with self._lock:
+            if self._pid != os.getpid():
+                # Producer I/O threads do not survive a fork, start fresh in the child
+                self._producers = {}
+                self._pid = os.getpid()
+            
+            producer = self._producers.get(key)
+            if producer is None:
+                self.logger.info(f"Creating pooled producer for {config.get('bootstrap_servers')}")
+                producer = PooledProducer(factory(**config), self.max_in_flight)
+                self._producers[key] = producer
+            
+            return producer
+    
+    def flush(self, timeout=None):
+        """Flush every pooled producer"""
+        with self._lock:
+            producers = list(self._producers.values())
+        
+        for producer in producers:
+            producer.flush(timeout=timeout)
+    
+    def close(self, timeout=None):
+        """Flush and close every pooled producer"""
+        with self._lock:
+            producers = list(self._producers.values())
+            self._producers = {}
+        
+        for producer in producers:
+            try:
+                producer.close(timeout=timeout)
+            except Exception as e:
+                self.logger.error(f"Failed to close producer: {e}")
+
+class LoadStats:
+    """Thread-safe send/ack counters and ack latency for a load test"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.acked = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+    
+    def record_send(self):
+        """Count a message handed to the producer"""
+        with self._lock:
+            self.sent += 1
+    
+    def record_ack(self, sent_at, metadata):
+        """Send future callback, records ack latency and payload size"""
+        self.latency.record(time.monotonic() - sent_at)
+        with self._lock:
+            self.acked += 1
+            self.bytes += max(getattr(metadata, 'serialized_value_size', 0), 0)
+    
+    def record_error(self, _=None):
+        """Send future errback, or a failed send call"""
+        with self._lock:
+            self.errors += 1
+    
+    def snapshot(self):
+        """Plain copy of the counters and latency histogram"""
+        with self._lock:
+            counters = {
+                'sent': self.sent,
+                'acked': self.acked,
+                'errors': self.errors,
+                'bytes': self.bytes
+            }
+        counters['latency'] = self.latency.snapshot()
+        return counters
+
+def _merge_stats(snapshots):
+    """Sum LoadStats snapshots from several workers"""
+    merged = LoadStats()
+    for snapshot in snapshots:
+        merged.sent += snapshot['sent']
+        merged.acked += snapshot['acked']
+        merged.errors += snapshot['errors']
+        merged.bytes += snapshot['bytes']
+        merged.latency.merge(snapshot['latency'])
+    return merged
+
+def _run_load_worker(worker_id, producer, topic, messages_per_sec, burst, duration, stop_event, stats, logger):
+    """Send messages at the target rate until stopped or duration elapses"""
+    bucket = TokenBucket(messages_per_sec, burst=burst)
+    deadline = time.monotonic() + duration if duration else None
+    count = 0
+    
+    try:
+        while not stop_event.is_set():
+            if deadline and time.monotonic() >= deadline:
+                break
+            if not bucket.acquire(stop_event=stop_event):
+                break
+            
+            message = {
+                'timestamp': time.time(),
+                'thread_id': worker_id,
+                'count': count
+            }
+            
+            sent_at = time.monotonic()
+            try:
+                future = producer.send(topic, value=message)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} send failed: {e}")
+                stats.record_error()
+                continue
+            
+            stats.record_send()
+            future.add_callback(stats.record_ack, sent_at)
+            future.add_errback(stats.record_error)
+            count += 1
+    finally:
+        producer.flush()
+        producer.close()
+
+def _load_worker_process(worker_id, producer_factory, producer_config, topic, messages_per_sec, burst, duration,
+                         stop_event, stats_queue, publish_interval):
+    """Process-mode worker, owns its producer and publishes stats snapshots to the parent"""
+    logger = get_logger(__name__)
+    stats = LoadStats()
+    finished = threading.Event()
+    
+    def publish():
+        while not finished.wait(publish_interval):
+            stats_queue.put((worker_id, stats.snapshot(), False))
+    
+    publisher = threading.Thread(target=publish, daemon=True)
+    publisher.start()
+    
+    try:
+        producer = producer_factory(**producer_config)
+        _run_load_worker(worker_id, producer, topic, messages_per_sec, burst, duration, stop_event, stats, logger)
+    except Exception as e:
+        logger.error(f"Worker {worker_id} failed: {e}")
+        stats.record_error()
+    finally:
+        finished.set()
+        publisher.join()
+        stats_queue.put((worker_id, stats.snapshot(), True))
+
+class LoadGenerator:
+    """Token-bucket paced producer load with ack latency reporting
+    
+    mode="thread" runs workers as threads sharing one LoadStats. mode="process"
+    runs each worker in its own process with its own producer, so serialization
+    and compression scale past the GIL; workers publish stats snapshots over a
+    queue and the parent aggregates them.
+    """
+    
+    def __init__(self, service, num_workers=3, messages_per_sec=200, duration=None, burst=None, report_interval=10,
+                 mode="thread", publish_interval=0.5):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown load mode: {mode}")
+        self.service = service
+        self.logger = service.logger
+        self.num_workers = num_workers
+        self.messages_per_sec = messages_per_sec
+        self.duration = duration
+        self.burst = burst
+        self.report_interval = report_interval
+        self.mode = mode
+        self.publish_interval = publish_interval
+        self.stats = LoadStats()
+        self.workers = []
+        self._worker_stats = {}
+        self._done_workers = set()
+        self._stats_lock = threading.Lock()
+        self._collector = None
+        self._started_at = None
+        self._finished_at = None
+        
+        if mode == "process":
+            self._mp = multiprocessing.get_context()
+            self._stop_event = self._mp.Event()
+            self._stats_queue = self._mp.Queue()
+        else:
+            self._stop_event = threading.Event()
+    
+    @property
+    def threads(self):
+        """Worker threads or processes"""
+        return self.workers
+    
+    def start(self):
+        """Start workers and the periodic reporter"""
+        self.logger.info(
+            f"Starting load test: {self.num_workers} {self.mode} workers, {self.messages_per_sec} msg/sec each"
+        )
+        self._started_at = time.monotonic()
+        
+        if self.mode == "process":
+            self._start_processes()
+        else:
+            self._start_threads()
+        
+        if self.report_interval:
+            threading.Thread(target=self._reporter, daemon=True).start()
+    
+    def _start_threads(self):
+        """Start thread workers sharing self.stats"""
+        for i in range(self.num_workers):
+            producer = self.service.create_producer()
+            thread = threading.Thread(
+                target=_run_load_worker,
+                args=(i, producer, self.service.topic, self.messages_per_sec, self.burst, self.duration,
+                      self._stop_event, self.stats, self.logger),
+                daemon=True
+            )
+            thread.start()
+            self.workers.append(thread)
+    
+    def _start_processes(self):
+        """Start worker processes and the stats collector thread"""
+        producer_config = self.service._producer_config()
+        
+        for i in range(self.num_workers):
+            process = self._mp.Process(
+                target=_load_worker_process,
+                args=(i, self.service.producer_factory, producer_config, self.service.topic,
+                      self.messages_per_sec, self.burst, self.duration, self._stop_event,
+                      self._stats_queue, self.publish_interval),
+                daemon=True
+            )
+            process.start()
+            self.workers.append(process)
+        
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+    
+    def _collect(self):
+        """Keep the latest stats snapshot from every worker process"""
+        while len(self._done_workers) < self.num_workers:
+            try:
+                worker_id, snapshot, done = self._stats_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self.workers):
+                    break
+                continue
+            
+            with self._stats_lock:
+                self._worker_stats[worker_id] = snapshot
+                if done:
+                    self._done_workers.add(worker_id)
+    
+    def snapshot(self):
+        """Aggregated counters and latency histogram across all workers"""
+        if self.mode == "thread":
+            return self.stats.snapshot()
+        
+        with self._stats_lock:
+            snapshots = list(self._worker_stats.values())
+        return _merge_stats(snapshots).snapshot()
+    
+    def worker_snapshots(self):
+        """Latest stats snapshot per worker process"""
+        with self._stats_lock:
+            return dict(self._worker_stats)
+    
+    def _reporter(self):
+        """Log achieved rate and latency percentiles every report_interval"""
+        last_acked = 0
+        last_time = time.monotonic()
+        
+        while not self._stop_event.wait(self.report_interval) and self.is_running():
+            now = time.monotonic()
+            stats = self.snapshot()
+            rate = (stats['acked'] - last_acked) / (now - last_time)
+            last_acked, last_time = stats['acked'], now
+            
+            latency = LatencyHistogram()
+            latency.merge(stats['latency'])
+            latency = latency.summary()
+            self.logger.info(
+                f"Load: {rate:.0f} msg/sec, acked={stats['acked']}, errors={stats['errors']}, "
+                f"p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms "
+                f"p99={latency['p99_ms']:.1f}ms max={latency['max_ms']:.1f}ms"
+            )
+    
+    def is_running(self):
+        """Whether any worker is still sending"""
+        return any(worker.is_alive() for worker in self.workers)
+    
+    def stop(self):
+        """Ask workers to stop, pending messages are still flushed"""
+        self._stop_event.set()
+    
+    def wait(self, timeout=None):
+        """Wait for workers to finish, returns True once all have"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for worker in self.workers:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            worker.join(remaining)
+        
+        if self.is_running():
+            return False
+        
+        if self._collector is not None:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            self._collector.join(remaining)
+            if self._collector.is_alive():
+                return False
+        
+        if self._finished_at is None:
+            self._finished_at = time.monotonic()
+        return True
+    
+    def summary(self):
+        """Achieved rate, byte/error counts and ack latency percentiles"""
+        end = self._finished_at or time.monotonic()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        stats = self.snapshot()
+        latency = LatencyHistogram()
+        latency.merge(stats['latency'])
+        latency = latency.summary()
+        
+        return {
+            'mode': self.mode,
+            'workers': self.num_workers,
+            'elapsed_sec': elapsed,
+            'sent': stats['sent'],
+            'acked': stats['acked'],
+            'errors': stats['errors'],
+            'bytes': stats['bytes'],
+            'rate': stats['acked'] / elapsed if elapsed else 0.0,
+            'p50_ms': latency['p50_ms'],
+            'p95_ms': latency['p95_ms'],
+            'p99_ms': latency['p99_ms'],
+            'max_ms': latency['max_ms']
+        }
 
 class MSKService:
     """MSK service for Kafka operations"""
     
-    def __init__(self):
+    def __init__(self, producer_manager=None, producer_factory=KafkaProducer, serializer='json', compression='gzip',
+                 auth=None):
         self.logger = get_logger(__name__)
-        self.bootstrap_servers = Settings.MSK_BOOTSTRAP_SERVERS
+        # none: plaintext MSK_BOOTSTRAP_SERVERS, iam: SASL/OAUTHBEARER against MSK_BS_IAM
+        self.auth = (auth or Settings.MSK_AUTH or 'none').lower()
+        self.bootstrap_servers = Settings.MSK_BS_IAM if self.auth == 'iam' else Settings.MSK_BOOTSTRAP_SERVERS
         self.topic = Settings.MSK_TOPIC
-        
-    def create_producer(self, **kwargs):
-        """Create Kafka producer with default config"""
+        self.producer_manager = producer_manager or ProducerManager.instance()
+        # Swap in a fake producer class to run without a broker, must be picklable for process mode
+        self.producer_factory = producer_factory
+        # Registered serializer name (json, orjson, msgpack, load-message) or a value -> bytes callable
+        self.serializer = serializer
+        self.compression = compression
+    
+    def _producer_config(self, serializer=None, compression=None, **kwargs):
+        """Build producer config from defaults and overrides"""
         config = {
             'bootstrap_servers': self.bootstrap_servers,
-            'value_serializer': lambda v: json.dumps(v).encode('utf-8'),
+            'value_serializer': get_serializer(serializer or self.serializer),
             'batch_size': 32768,
             'linger_ms': 5,
-            'compression_type': 'gzip',
+            'compression_type': compression_type(compression or self.compression),
             'acks': 'all'
         }
+        config.update(msk_auth_config(self.auth))
         config.update(kwargs)
-        
-        return KafkaProducer(**config)
+        return config
     
-    def send_message(self, message, topic=None):
-        """Send single message"""
-        producer = self.create_producer()
-        try:
-            future = producer.send(topic or self.topic, value=message)
-            producer.flush()
-            return future.get(timeout=10)
-        finally:
-            producer.close()
+    def create_producer(self, serializer=None, compression=None, **kwargs):
+        """Create Kafka producer with default config"""
+        return self.producer_factory(**self._producer_config(serializer, compression, **kwargs))
+    
+    def get_producer(self, serializer=None, compression=None, **kwargs):
+        """Get the shared long-lived producer for this config"""
+        config = self._producer_config(serializer, compression, **kwargs)
+        return self.producer_manager.get(config, factory=self.producer_factory)
+    
+    def send_async(self, message, topic=None, key=None, timeout=None):
+        """Send message without waiting for the ack, returns the send future"""
+        producer = self.get_producer()
+        return producer.send_async(topic or self.topic, value=message, key=key, timeout=timeout)
+    
+    def send_message(self, message, topic=None, timeout=10):
+        """Send single message and wait for the ack"""
+        future = self.send_async(message, topic=topic)
+        return future.get(timeout=timeout)
     
-    def generate_load(self, num_threads=3, messages_per_sec=200, duration=None):
-        """Generate load for testing"""
-        self.logger.info(f"Starting load test: {num_threads} threads, {messages_per_sec} msg/sec")
+    def flush(self, timeout=None):
+        """Flush all pooled producers"""
+        self.producer_manager.flush(timeout=timeout)
+    
+    def close(self, timeout=None):
+        """Flush and close all pooled producers, call once at shutdown"""
+        self.producer_manager.close(timeout=timeout)
+    
+    def generate_load(self, num_threads=3, messages_per_sec=200, duration=None, burst=None, report_interval=10,
+                      mode="thread", num_workers=None):
+        """Generate load for testing, messages_per_sec is paced per worker
+        
+        mode="process" runs num_workers (default num_threads) processes, each with
+        its own producer. Returns a running LoadGenerator; call stop()/wait() and
+        summary() on it.
+        """
+        generator = LoadGenerator(
+            self,
+            num_workers=num_workers or num_threads,
+            messages_per_sec=messages_per_sec,
+            duration=duration,
+            burst=burst,
+            report_interval=report_interval,
+            mode=mode
+        )
+        generator.start()
+        return generator
+    
+    def benchmark_serialization(self, message=None, serializers=None, codecs=None, num_messages=10000,
+                                batch_size=100, end_to_end=False):
+        """Compare serializer/codec combinations on a sample payload
         
-        def worker(thread_id):
-            producer = self.create_producer()
-            count = 0
-            start_time = time.time()
+        Reports encode ns/msg, compressed bytes/msg (compressing batch_size
+        messages at a time, like a producer record batch) and msgs/s through a
+        real producer when end_to_end is set.
+        """
+        message = message or {'timestamp': time.time(), 'thread_id': 0, 'count': 0}
+        serializers = serializers or available_serializers()
+        codecs = codecs or available_codecs()
+        is_load_message = set(message) == set(LOAD_MESSAGE_SCHEMA)
+        results = []
+        
+        # Vary the load message like generate_load does so codecs don't see identical records
+        if is_load_message:
+            messages = [dict(message, timestamp=message['timestamp'] + i / 1000, count=i) for i in range(batch_size)]
+        else:
+            messages = [message] * batch_size
+        
+        for serializer_name in serializers:
+            if serializer_name == 'load-message' and not is_load_message:
+                continue
+            serialize = get_serializer(serializer_name)
             
-            while True:
-                if duration and (time.time() - start_time) > duration:
-                    break
-                    
-                message = {
-                    'timestamp': time.time(),
-                    'thread_id': thread_id,
-                    'count': count
+            start = time.perf_counter_ns()
+            for i in range(num_messages):
+                serialize(messages[i % batch_size])
+            encode_ns = (time.perf_counter_ns() - start) / num_messages
+            encoded = [serialize(m) for m in messages]
+            batch = b''.join(encoded)
+            
+            for codec_name in codecs:
+                encoder = COMPRESSION_CODECS[codec_name][1]
+                result = {
+                    'serializer': serializer_name,
+                    'codec': codec_name,
+                    'encode_ns': encode_ns,
+                    'raw_bytes': len(batch) / batch_size,
+                    'compressed_bytes': len(encoder(batch)) / batch_size,
+                    'msgs_per_sec': None
                 }
                 
-                producer.send(self.topic, value=message)
-                count += 1
-                
-                if count % 100 == 0:
-                    producer.flush()
-                    self.logger.info(f"Thread {thread_id}: {count} messages")
+                if end_to_end:
+                    result['msgs_per_sec'] = self._measure_send_rate(serializer_name, codec_name, message, num_messages)
                 
-                time.sleep(1.0 / messages_per_sec)
-            
-            producer.close()
-        
-        threads = []
-        for i in range(num_threads):
-            thread = threading.Thread(target=worker, args=(i,))
-            thread.start()
-            threads.append(thread)
+                self.logger.info(
+                    f"{serializer_name}/{codec_name}: {encode_ns:.0f} ns/msg, "
+                    f"{result['compressed_bytes']:.1f} bytes/msg compressed"
+                )
+                results.append(result)
         
-        return threads
\ No newline at end of file
+        return results
+    
+    def _measure_send_rate(self, serializer, codec, message, num_messages):
+        """Send num_messages through a dedicated producer and return msgs/s"""
+        producer = self.create_producer(serializer=serializer, compression=codec)
+        try:
+            start = time.perf_counter()
+            for _ in range(num_messages):
+                producer.send(self.topic, value=message)
+            producer.flush()
+            return num_messages / (time.perf_counter() - start)
+        finally:
+            producer.close()
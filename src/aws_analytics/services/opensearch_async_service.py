@@ -0,0 +1,198 @@
+import asyncio
+from ..config import Settings
+from ..utils import get_logger, get_aws_credentials
+
+def create_async_client(hosts=None, auth=None, pool_maxsize=None, http_compress=True, timeout=30, max_retries=3,
+                        retry_on_timeout=True):
+    """AsyncOpenSearch client with the same auth modes and pool options as get_opensearch_client
+    
+    Needs the async extra (pip install "opensearch-py[async]").
+    """
+    from opensearchpy import AsyncOpenSearch, AWSV4SignerAsyncAuth
+    
+    hosts = hosts or [{'host': Settings.OPENSEARCH_ENDPOINT, 'port': Settings.OPENSEARCH_PORT}]
+    auth = (auth or Settings.OPENSEARCH_AUTH).lower()
+    if auth == 'iam':
+        http_auth = AWSV4SignerAsyncAuth(get_aws_credentials(), Settings.AWS_REGION, Settings.OPENSEARCH_SERVICE)
+    elif auth == 'basic':
+        if not all([Settings.OPENSEARCH_USER, Settings.OPENSEARCH_PWD]):
+            raise ValueError("OpenSearch credentials not configured")
+        http_auth = (Settings.OPENSEARCH_USER, Settings.OPENSEARCH_PWD)
+    else:
+        raise ValueError(f"Unknown OpenSearch auth mode: {auth}")
+    
+    return AsyncOpenSearch(
+        hosts=hosts,
+        http_auth=http_auth,
+        use_ssl=True,
+        verify_certs=Settings.OPENSEARCH_VERIFY_CERTS,
+        maxsize=pool_maxsize or Settings.OPENSEARCH_POOL_MAXSIZE,
+        http_compress=http_compress,
+        timeout=timeout,
+        max_retries=max_retries,
+        retry_on_timeout=retry_on_timeout
+    )
+
+class AsyncOpenSearchService:
+    """Asyncio OpenSearch service mirroring OpenSearchService on AsyncOpenSearch"""
+    
+    def __init__(self, client=None, **client_options):
+        self.logger = get_logger(__name__)
+        self.client = client or create_async_client(**client_options)
+    
+    async def close(self):
+        """Close the client's connection pool"""
+        await self.client.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    async def index_document(self, index_name, document, doc_id=None):
+        """Index single document"""
+        try:
+            response = await self.client.index(
+                index=index_name,
+                body=document,
+                id=doc_id
+            )
+            self.logger.info(f"Document indexed: {response['_id']}")
+            return response
+        except Exception as e:
+            self.logger.error(f"Failed to index document: {e}")
+            raise
+    
+    def _bulk_bodies(self, index_name, documents, chunk_size, max_chunk_bytes):
+        """Pack documents into (newline-delimited body, doc count) chunks"""
+        dumps = self.client.transport.serializer.dumps
+        lines = []
+        size = 0
+        for doc in documents:
+            action = {'index': {'_index': index_name}}
+            if doc.get('id') is not None:
+                action['index']['_id'] = doc['id']
+            pair = dumps(action) + '\n' + dumps(doc) + '\n'
+            pair_size = len(pair.encode('utf-8'))
+            
+            if lines and (len(lines) >= chunk_size or size + pair_size > max_chunk_bytes):
+                yield ''.join(lines), len(lines)
+                lines = []
+                size = 0
+            lines.append(pair)
+            size += pair_size
+        
+        if lines:
+            yield ''.join(lines), len(lines)
+    
+    async def bulk_stream(self, index_name, documents, concurrency=4, chunk_size=500,
+                          max_chunk_bytes=10 * 1024 * 1024):
+        """Index an iterable of documents with up to concurrency bulk requests in flight
+        
+        Yields (ok, item) per document as each request completes, so failed
+        documents are reported without stopping the load. A semaphore bounds
+        the requests in flight and a bounded queue the finished chunks waiting
+        for the consumer, so memory stays at about 2 x concurrency chunks.
+        Closing the stream early cancels the requests still in flight.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        results = asyncio.Queue(maxsize=concurrency)
+        tasks = set()
+        done = object()
+        failure = []
+        
+        async def send(body, count):
+            try:
+                try:
+                    response = await self.client.bulk(body=body)
+                    items = [(next(iter(item.values())).get('status', 200) < 300, item) for item in response['items']]
+                except Exception as e:
+                    self.logger.error(f"Bulk request failed: {e}")
+                    items = [(False, {'index': {'error': str(e)}})] * count
+                await results.put(items)
+            finally:
+                semaphore.release()
+        
+        async def feed():
+            try:
+                for body, count in self._bulk_bodies(index_name, documents, chunk_size, max_chunk_bytes):
+                    await semaphore.acquire()
+                    task = asyncio.create_task(send(body, count))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            except Exception as e:
+                # The documents iterator or serialization failed, stop in-flight requests and hand the error over
+                failure.append(e)
+                for task in list(tasks):
+                    task.cancel()
+            # Cancellation comes from the consumer closing the stream, so only other exits need the sentinel
+            await results.put(done)
+        
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                items = await results.get()
+                if items is done:
+                    if failure:
+                        raise failure[0]
+                    break
+                for item in items:
+                    yield item
+        finally:
+            # Also runs on GeneratorExit/CancelledError when the consumer stops early
+            pending = [feeder, *tasks]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def bulk_index(self, index_name, documents, concurrency=4, chunk_size=500,
+                         max_chunk_bytes=10 * 1024 * 1024, max_error_samples=10):
+        """Bulk index any iterable of documents, returns (success_count, failed_count, error_samples)
+        
+        Only the first max_error_samples failed items are kept and logged.
+        """
+        success = 0
+        failed = 0
+        errors = []
+        
+        try:
+            async for ok, item in self.bulk_stream(index_name, documents, concurrency, chunk_size, max_chunk_bytes):
+                if ok:
+                    success += 1
+                    continue
+                failed += 1
+                if len(errors) < max_error_samples:
+                    errors.append(item)
+                    self.logger.error(f"Failed to index document: {item}")
+            
+            self.logger.info(f"Bulk indexed {success} documents, {failed} failed")
+            return success, failed, errors
+        except Exception as e:
+            self.logger.error(f"Bulk indexing failed: {e}")
+            raise
+    
+    async def search(self, index_name, query, size=10):
+        """Search documents"""
+        try:
+            response = await self.client.search(
+                index=index_name,
+                body=query,
+                size=size
+            )
+            return response
+        except Exception as e:
+            self.logger.error(f"Search failed: {e}")
+            raise
+    
+    async def create_index(self, index_name, mapping=None):
+        """Create index with optional mapping"""
+        try:
+            body = {"mappings": mapping} if mapping else {}
+            response = await self.client.indices.create(index=index_name, body=body)
+            self.logger.info(f"Index created: {index_name}")
+            return response
+        except Exception as e:
+            self.logger.error(f"Failed to create index: {e}")
+            raise
@@ -0,0 +1,225 @@
+import queue
+import threading
+import time
+from ..utils import LatencyHistogram, backoff_delay
+
+REJECTION_TYPES = ('es_rejected_execution_exception', 'rejected_execution_exception')
+
+def _is_rejection(status, error=None):
+    """Whether a bulk item or request failed because the cluster is overloaded"""
+    if status == 429:
+        return True
+    error_type = error.get('type') if isinstance(error, dict) else str(error or '')
+    return any(rejection in (error_type or '') for rejection in REJECTION_TYPES)
+
+class ParallelBulkIngester:
+    """Concurrent bulk indexing with AIMD backpressure
+    
+    The caller's thread packs documents into bulk bodies (chunk_size docs or
+    max_chunk_bytes) and feeds them through a bounded queue to max_workers
+    sender threads. Only `concurrency` of them send at once: every 429 /
+    es_rejected_execution_exception halves it and backs off before re-sending
+    just the rejected documents, and each run of successful requests as long
+    as the current concurrency adds one back, up to max_workers.
+    """
+    
+    def __init__(self, service, index_name, max_workers=8, min_workers=1, initial_workers=None, chunk_size=500,
+                 max_chunk_bytes=10 * 1024 * 1024, queue_size=None, max_retries=8, base_backoff=0.5,
+                 max_backoff=30.0, report_interval=10):
+        self.service = service
+        self.logger = service.logger
+        self.client = service.client
+        self.index_name = index_name
+        self.max_workers = max_workers
+        self.min_workers = min_workers
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.report_interval = report_interval
+        self.latency = LatencyHistogram()
+        self.concurrency = initial_workers or max_workers
+        self.stats = {'docs': 0, 'failed': 0, 'rejected': 0, 'requests': 0, 'bytes': 0,
+                      'concurrency_decreases': 0, 'concurrency_increases': 0}
+        self._queue = queue.Queue(maxsize=queue_size or max_workers * 2)
+        self._slots = threading.Condition()
+        self._active = 0
+        self._healthy_streak = 0
+        self._lock = threading.Lock()
+        self._error = None
+        self._started_at = None
+    
+    def _chunks(self, documents):
+        """Pack documents into (lines, bytes) bulk bodies, serialized like the client does"""
+        dumps = self.client.transport.serializer.dumps
+        lines = []
+        size = 0
+        for doc in documents:
+            action = {'index': {'_index': self.index_name}}
+            if doc.get('id') is not None:
+                action['index']['_id'] = doc['id']
+            pair = dumps(action) + '\n' + dumps(doc) + '\n'
+            pair_size = len(pair.encode('utf-8'))
+            
+            if lines and (len(lines) >= self.chunk_size or size + pair_size > self.max_chunk_bytes):
+                yield lines, size
+                lines = []
+                size = 0
+            lines.append(pair)
+            size += pair_size
+        
+        if lines:
+            yield lines, size
+    
+    def _acquire(self):
+        with self._slots:
+            while self._active >= self.concurrency:
+                self._slots.wait()
+            self._active += 1
+    
+    def _release(self):
+        with self._slots:
+            self._active -= 1
+            self._slots.notify_all()
+    
+    def _on_rejected(self):
+        """Multiplicative decrease"""
+        with self._slots:
+            self._healthy_streak = 0
+            if self.concurrency > self.min_workers:
+                self.concurrency = max(self.min_workers, self.concurrency // 2)
+                self.stats['concurrency_decreases'] += 1
+    
+    def _on_healthy(self):
+        """Additive increase after a full round of clean requests"""
+        with self._slots:
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.concurrency and self.concurrency < self.max_workers:
+                self.concurrency += 1
+                self._healthy_streak = 0
+                self.stats['concurrency_increases'] += 1
+                self._slots.notify_all()
+    
+    def _send(self, lines):
+        """One bulk request, returns (rejected_lines, failed_count)"""
+        self._acquire()
+        started = time.monotonic()
+        try:
+            response = self.client.bulk(body=''.join(lines))
+        except Exception as e:
+            if _is_rejection(getattr(e, 'status_code', None), getattr(e, 'error', None)):
+                return lines, 0
+            raise
+        finally:
+            self._release()
+            self.latency.record(time.monotonic() - started)
+            with self._lock:
+                self.stats['requests'] += 1
+        
+        if not response.get('errors'):
+            return [], 0
+        
+        rejected = []
+        failed = 0
+        for line, item in zip(lines, response['items']):
+            result = next(iter(item.values()))
+            if result.get('status', 200) < 300:
+                continue
+            if _is_rejection(result.get('status'), result.get('error')):
+                rejected.append(line)
+            else:
+                failed += 1
+                if failed == 1:
+                    self.logger.error(f"Failed to index document: {result.get('error')}")
+        return rejected, failed
+    
+    def _send_with_retry(self, lines, size):
+        attempt = 0
+        total = len(lines)
+        failed_total = 0
+        while lines:
+            lines, failed = self._send(lines)
+            failed_total += failed
+            if not lines:
+                self._on_healthy()
+                break
+            
+            with self._lock:
+                self.stats['rejected'] += len(lines)
+            self._on_rejected()
+            if attempt >= self.max_retries:
+                self.logger.error(f"Giving up on {len(lines)} rejected documents after {attempt} retries")
+                failed_total += len(lines)
+                break
+            time.sleep(backoff_delay(attempt, self.base_backoff, self.max_backoff))
+            attempt += 1
+        
+        with self._lock:
+            self.stats['docs'] += total - failed_total
+            self.stats['failed'] += failed_total
+            self.stats['bytes'] += size
+    
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._send_with_retry(*item)
+            except Exception as e:
+                self.logger.error(f"Bulk request failed: {e}")
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+    
+    def run(self, documents):
+        """Index an iterable of documents, returns final metrics, re-raises a request failure"""
+        self._started_at = time.monotonic()
+        last_report = self._started_at
+        workers = [threading.Thread(target=self._work, daemon=True) for _ in range(self.max_workers)]
+        for worker in workers:
+            worker.start()
+        
+        try:
+            for chunk in self._chunks(documents):
+                if self._error is not None:
+                    break
+                self._queue.put(chunk)
+                
+                now = time.monotonic()
+                if self.report_interval and now - last_report >= self.report_interval:
+                    self._log_metrics()
+                    last_report = now
+        finally:
+            for _ in workers:
+                self._queue.put(None)
+            for worker in workers:
+                worker.join()
+        
+        if self._error is not None:
+            raise self._error
+        metrics = self.metrics()
+        self._log_metrics()
+        return metrics
+    
+    def metrics(self):
+        """Throughput, rejections, current concurrency and bulk latency percentiles"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        with self._lock:
+            stats = dict(self.stats)
+        stats['elapsed'] = elapsed
+        stats['docs_per_sec'] = stats['docs'] / elapsed if elapsed > 0 else 0
+        stats['concurrency'] = self.concurrency
+        stats['latency'] = self.latency.summary()
+        return stats
+    
+    def _log_metrics(self):
+        metrics = self.metrics()
+        latency = metrics['latency']
+        self.logger.info(f"Indexed {metrics['docs']} docs ({metrics['docs_per_sec']:.0f}/s), "
+                         f"{metrics['failed']} failed, {metrics['rejected']} rejected, "
+                         f"concurrency {metrics['concurrency']}, bulk p50 {latency['p50_ms']:.1f} ms "
+                         f"p99 {latency['p99_ms']:.1f} ms")
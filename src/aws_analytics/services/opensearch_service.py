@@ -1,25 +1,101 @@
+import copy
+import fnmatch
+import threading
+from contextlib import contextmanager
 from opensearchpy import OpenSearch, helpers
 from ..config import Settings
-from ..utils import get_logger
+from ..utils import get_logger, get_opensearch_signer, canonical_key, RotatingNDJSONWriter
+from .opensearch_bulk import ParallelBulkIngester
+
+# Index settings applied for the duration of bulk_load_mode
+BULK_LOAD_SETTINGS = {
+    'refresh_interval': '-1',
+    'number_of_replicas': 0
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_opensearch_client(hosts=None, auth=None, pool_maxsize=None, http_compress=True, timeout=30,
+                          max_retries=3, retry_on_timeout=True):
+    """Process-wide pooled OpenSearch client for a configuration
+    
+    auth is 'basic' (OPENSEARCH_USER/OPENSEARCH_PWD) or 'iam' (SigV4 with the
+    shared, refreshable boto3 credentials). Services and their worker threads
+    share one client, and with it one keep-alive connection pool of
+    pool_maxsize connections per host.
+    """
+    hosts = hosts or [{'host': Settings.OPENSEARCH_ENDPOINT, 'port': Settings.OPENSEARCH_PORT}]
+    auth = (auth or Settings.OPENSEARCH_AUTH).lower()
+    pool_maxsize = pool_maxsize or Settings.OPENSEARCH_POOL_MAXSIZE
+    key = (repr(hosts), auth, pool_maxsize, http_compress, timeout, max_retries, retry_on_timeout)
+    
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+        
+        if auth == 'iam':
+            http_auth = get_opensearch_signer(Settings.OPENSEARCH_SERVICE)
+        elif auth == 'basic':
+            if not all([Settings.OPENSEARCH_USER, Settings.OPENSEARCH_PWD]):
+                raise ValueError("OpenSearch credentials not configured")
+            http_auth = (Settings.OPENSEARCH_USER, Settings.OPENSEARCH_PWD)
+        else:
+            raise ValueError(f"Unknown OpenSearch auth mode: {auth}")
+        
+        client = OpenSearch(
+            hosts=hosts,
+            http_auth=http_auth,
+            use_ssl=True,
+            verify_certs=Settings.OPENSEARCH_VERIFY_CERTS,
+            pool_maxsize=pool_maxsize,
+            http_compress=http_compress,
+            timeout=timeout,
+            max_retries=max_retries,
+            retry_on_timeout=retry_on_timeout
+        )
+        _clients[key] = client
+        return client
+
+class _PitUnsupported(Exception):
+    """The first search_after page on a point in time failed"""
 
 class OpenSearchService:
-    """OpenSearch service for indexing and search operations"""
+    """OpenSearch service for indexing and search operations
+    
+    Without an explicit client, services with the same settings share one
+    pooled client from get_opensearch_client (see there for the options).
     
-    def __init__(self):
+    With a cache (utils.TTLCache), search results are cached per canonical
+    (index, query, size) and dropped for an index whenever this service
+    writes to it. Cached responses are shared, treat them as read-only.
+    """
+    
+    def __init__(self, client=None, cache=None, **client_options):
         self.logger = get_logger(__name__)
-        self.client = self._create_client()
+        self.client = client or self._create_client(**client_options)
+        self.cache = cache
         
-    def _create_client(self):
-        """Create OpenSearch client"""
-        if not all([Settings.OPENSEARCH_ENDPOINT, Settings.OPENSEARCH_USER, Settings.OPENSEARCH_PWD]):
-            raise ValueError("OpenSearch credentials not configured")
+    def _create_client(self, **client_options):
+        """Create or reuse the pooled OpenSearch client"""
+        if not Settings.OPENSEARCH_ENDPOINT and not client_options.get('hosts'):
+            raise ValueError("OpenSearch endpoint not configured")
             
-        return OpenSearch(
-            hosts=[{'host': Settings.OPENSEARCH_ENDPOINT, 'port': 443}],
-            http_auth=(Settings.OPENSEARCH_USER, Settings.OPENSEARCH_PWD),
-            use_ssl=True,
-            verify_certs=False
-        )
+        return get_opensearch_client(**client_options)
+    
+    def invalidate_cache(self, index_name=None):
+        """Drop cached searches that may cover index_name (patterns and multi-index searches included)"""
+        if self.cache is None:
+            return
+        if index_name is None:
+            self.cache.invalidate()
+            return
+        
+        def covers(cached_index):
+            return any(fnmatch.fnmatchcase(index_name, pattern) for pattern in str(cached_index).split(','))
+        
+        self.cache.invalidate(match=covers)
     
     def index_document(self, index_name, document, doc_id=None):
         """Index single document"""
@@ -34,37 +110,232 @@ class OpenSearchService:
         except Exception as e:
             self.logger.error(f"Failed to index document: {e}")
             raise
+        finally:
+            self.invalidate_cache(index_name)
     
-    def bulk_index(self, index_name, documents):
-        """Bulk index documents"""
-        actions = [
-            {
+    @staticmethod
+    def bulk_actions(index_name, documents):
+        """Lazily turn documents into bulk index actions"""
+        for doc in documents:
+            yield {
                 "_index": index_name,
                 "_source": doc,
                 "_id": doc.get('id')
-            } for doc in documents
-        ]
+            }
+    
+    def stream_bulk(self, index_name, documents, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024, max_retries=3,
+                    yield_ok=True):
+        """Index any iterable of documents with streaming_bulk, yields (ok, item) per document
         
+        Requests are cut at chunk_size documents or max_chunk_bytes, whichever
+        comes first, and only one chunk is held in memory at a time. Failed
+        documents are yielded with ok=False instead of stopping the load;
+        429 rejections are retried max_retries times with backoff.
+        """
         try:
-            response = helpers.bulk(self.client, actions)
-            self.logger.info(f"Bulk indexed {len(documents)} documents")
-            return response
+            yield from helpers.streaming_bulk(
+                self.client,
+                self.bulk_actions(index_name, documents),
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                raise_on_error=False,
+                raise_on_exception=False,
+                max_retries=max_retries,
+                yield_ok=yield_ok
+            )
+        finally:
+            self.invalidate_cache(index_name)
+    
+    def bulk_index(self, index_name, documents, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024, max_retries=3,
+                   max_error_samples=10):
+        """Bulk index any iterable of documents in constant memory
+        
+        Returns (success_count, failed_count, error_samples); only the first
+        max_error_samples failed items are kept and logged.
+        """
+        success = 0
+        failed = 0
+        errors = []
+        
+        try:
+            for ok, item in self.stream_bulk(index_name, documents, chunk_size, max_chunk_bytes, max_retries):
+                if ok:
+                    success += 1
+                    continue
+                failed += 1
+                if len(errors) < max_error_samples:
+                    errors.append(item)
+                    self.logger.error(f"Failed to index document: {item}")
+            
+            self.logger.info(f"Bulk indexed {success} documents, {failed} failed")
+            return success, failed, errors
         except Exception as e:
             self.logger.error(f"Bulk indexing failed: {e}")
             raise
     
-    def search(self, index_name, query, size=10):
-        """Search documents"""
+    def parallel_bulk_index(self, index_name, documents, max_workers=8, **kwargs):
+        """Index an iterable of documents with concurrent bulk workers and 429 backpressure, returns metrics"""
+        ingester = ParallelBulkIngester(self, index_name, max_workers=max_workers, **kwargs)
+        try:
+            return ingester.run(documents)
+        except Exception as e:
+            self.logger.error(f"Parallel bulk indexing failed: {e}")
+            raise
+        finally:
+            self.invalidate_cache(index_name)
+    
+    def search(self, index_name, query, size=10, use_cache=True):
+        """Search documents, served from the cache when one is configured and use_cache is set"""
+        cache_key = None
+        namespace = ','.join(index_name) if isinstance(index_name, (list, tuple)) else index_name
+        if self.cache is not None and use_cache:
+            cache_key = canonical_key(query, size)
+            # Taken before the request, so a write invalidating meanwhile keeps the stale response out
+            generation = self.cache.generation
+            response = self.cache.get(namespace, cache_key)
+            if response is not None:
+                return response
+        
         try:
             response = self.client.search(
                 index=index_name,
                 body=query,
                 size=size
             )
-            return response
         except Exception as e:
             self.logger.error(f"Search failed: {e}")
             raise
+        
+        if cache_key is not None:
+            self.cache.set(namespace, cache_key, response, generation)
+        return response
+    
+    def iter_documents(self, index_name, query=None, batch_size=1000, slice_id=None, max_slices=None,
+                       keep_alive='5m', sort=None, pit_id=None):
+        """Stream every hit matching query (a search body) in batches of batch_size
+        
+        Uses a point in time with search_after, falling back to a scroll when
+        PIT is unavailable. With max_slices > 1 only slice slice_id of the
+        results is returned, so several workers can export one index in
+        parallel; pass a shared pit_id so all slices read the same snapshot.
+        Only one batch of hits is held in memory.
+        """
+        body = copy.deepcopy(query) if query else {'query': {'match_all': {}}}
+        if max_slices and max_slices > 1:
+            body['slice'] = {'id': slice_id or 0, 'max': max_slices}
+        
+        owns_pit = pit_id is None
+        if owns_pit:
+            pit_id = self._create_pit(index_name, keep_alive)
+            if pit_id is None:
+                yield from self._iter_scroll(index_name, body, batch_size, keep_alive)
+                return
+        
+        try:
+            yield from self._iter_pit(pit_id, body, batch_size, keep_alive, sort or [{'_shard_doc': 'asc'}])
+        except _PitUnsupported as e:
+            self.logger.info(f"search_after on point in time failed for {index_name}, using scroll: {e.__cause__}")
+            yield from self._iter_scroll(index_name, body, batch_size, keep_alive)
+        finally:
+            if owns_pit:
+                self._delete_pit(pit_id)
+    
+    def _create_pit(self, index_name, keep_alive):
+        """Open a point in time, None if the cluster does not support it"""
+        try:
+            return self.client.create_point_in_time(index=index_name, keep_alive=keep_alive)['pit_id']
+        except Exception as e:
+            self.logger.info(f"Point in time unavailable for {index_name}, using scroll: {e}")
+            return None
+    
+    def _delete_pit(self, pit_id):
+        try:
+            self.client.delete_point_in_time(body={'pit_id': [pit_id]})
+        except Exception as e:
+            self.logger.error(f"Failed to delete point in time: {e}")
+    
+    def _iter_pit(self, pit_id, body, batch_size, keep_alive, sort):
+        """Page through a point in time with search_after"""
+        body = dict(body, size=batch_size, sort=sort, pit={'id': pit_id, 'keep_alive': keep_alive})
+        first = True
+        
+        while True:
+            try:
+                response = self.client.search(body=body)
+            except Exception as e:
+                if first:
+                    raise _PitUnsupported() from e
+                self.logger.error(f"Search failed: {e}")
+                raise
+            first = False
+            
+            hits = response['hits']['hits']
+            if not hits:
+                return
+            yield from hits
+            
+            body['pit']['id'] = response.get('pit_id', body['pit']['id'])
+            body['search_after'] = hits[-1]['sort']
+            if len(hits) < batch_size:
+                return
+    
+    def _iter_scroll(self, index_name, body, batch_size, keep_alive):
+        """Page through a scroll"""
+        body = dict(body, sort=['_doc'])
+        scroll_id = None
+        try:
+            response = self.client.search(index=index_name, body=body, scroll=keep_alive, size=batch_size)
+            while True:
+                scroll_id = response.get('_scroll_id')
+                hits = response['hits']['hits']
+                if not hits:
+                    return
+                yield from hits
+                response = self.client.scroll(scroll_id=scroll_id, scroll=keep_alive)
+        except Exception as e:
+            self.logger.error(f"Scroll failed: {e}")
+            raise
+        finally:
+            if scroll_id:
+                try:
+                    self.client.clear_scroll(scroll_id=scroll_id)
+                except Exception as e:
+                    self.logger.error(f"Failed to clear scroll: {e}")
+    
+    def export_ndjson(self, index_name, directory, query=None, slices=4, batch_size=1000,
+                      max_bytes=128 * 1024 * 1024, compress=False):
+        """Export matching documents' _source to rotating NDJSON files, one writer per slice, returns doc count"""
+        counts = [0] * slices
+        errors = []
+        pit_id = self._create_pit(index_name, '5m')
+        
+        def export_slice(slice_id):
+            writer = RotatingNDJSONWriter(directory, prefix=f"{index_name}_slice{slice_id}", max_bytes=max_bytes,
+                                          max_seconds=None, compress=compress)
+            try:
+                for hit in self.iter_documents(index_name, query, batch_size, slice_id, slices, pit_id=pit_id):
+                    writer.write(hit['_source'])
+                    counts[slice_id] += 1
+                    if writer.should_rotate():
+                        writer.rotate()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                writer.close()
+        
+        workers = [threading.Thread(target=export_slice, args=(i,)) for i in range(slices)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if pit_id is not None:
+            self._delete_pit(pit_id)
+        
+        if errors:
+            raise errors[0]
+        total = sum(counts)
+        self.logger.info(f"Exported {total} documents from {index_name} to {directory}")
+        return total
     
     def create_index(self, index_name, mapping=None):
         """Create index with optional mapping"""
@@ -75,4 +346,55 @@ class OpenSearchService:
             return response
         except Exception as e:
             self.logger.error(f"Failed to create index: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    @contextmanager
+    def bulk_load_mode(self, index_name, settings=None, force_merge_segments=None):
+        """Apply ingest-optimized index settings while the block runs, restore them afterwards
+        
+        Refresh is disabled and replicas dropped (plus any extra settings) on
+        entry. On exit, even after a failure, the previous values are put back
+        (settings that were unset go back to the cluster default), the index is
+        refreshed and, if the block succeeded and force_merge_segments is set,
+        force-merged. A failed restore is logged, and raised only if the block
+        itself succeeded.
+        
+        index_name may be an alias or a pattern: settings are read and restored
+        per concrete index, and the previous values are yielded keyed by index.
+        """
+        overrides = dict(BULK_LOAD_SETTINGS, **(settings or {}))
+        
+        try:
+            current = self.client.indices.get_settings(index=index_name, flat_settings=True)
+            if not current:
+                raise ValueError(f"No index matches {index_name}")
+            previous = {
+                index: {key: info['settings'].get(f'index.{key}') for key in overrides}
+                for index, info in current.items()
+            }
+            indices = ','.join(previous)
+            self.client.indices.put_settings(index=indices, body={'index': overrides})
+            self.logger.info(f"Bulk load mode on for {indices}: {overrides}")
+        except Exception as e:
+            self.logger.error(f"Failed to enable bulk load mode: {e}")
+            raise
+        
+        completed = False
+        try:
+            yield previous
+            completed = True
+        finally:
+            try:
+                for index, values in previous.items():
+                    self.client.indices.put_settings(index=index, body={'index': values})
+                self.client.indices.refresh(index=index_name)
+                self.invalidate_cache(index_name)
+                if force_merge_segments and completed:
+                    self.client.indices.forcemerge(index=index_name, max_num_segments=force_merge_segments,
+                                                   request_timeout=3600)
+                self.logger.info(f"Bulk load mode off for {index_name}, restored {previous}")
+            except Exception as e:
+                self.logger.error(f"Failed to restore index settings for {index_name}: {e}")
+                # Don't mask the exception that ended the block
+                if completed:
+                    raise
@@ -0,0 +1,59 @@
+import io
+from datetime import date, datetime
+
+# Bytes requested from the stream per COPY data message
+COPY_READ_SIZE = 256 * 1024
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def copy_text_value(value):
+    """One value in PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+def copy_text_row(row):
+    """A row tuple as one tab-separated COPY text line"""
+    return '\t'.join(map(copy_text_value, row)) + '\n'
+
+class RowStream(io.RawIOBase):
+    """Read-only file object serving rows from an iterator as COPY text
+    
+    copy_expert pulls fixed-size reads; each read formats just enough rows to
+    fill it, so at most one read's worth of text is held in memory.
+    """
+    
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = bytearray()
+        self._exhausted = False
+        self.rows_read = 0
+        self.bytes_read = 0
+    
+    def readable(self):
+        return True
+    
+    def read(self, size=-1):
+        while not self._exhausted and (size < 0 or len(self._buffer) < size):
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                self._exhausted = True
+                break
+            self._buffer += copy_text_row(row).encode('utf-8')
+            self.rows_read += 1
+        
+        if size < 0 or size >= len(self._buffer):
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            chunk = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        self.bytes_read += len(chunk)
+        return chunk
@@ -0,0 +1,191 @@
+import threading
+import time
+from contextlib import contextmanager
+from psycopg2 import extensions
+from ..utils import LatencyHistogram, get_logger
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+class ConnectionPool:
+    """Thread-safe pool of PostgreSQL connections
+    
+    Holds between min_size and max_size connections made by connect().
+    Checkouts block up to timeout seconds when all max_size are in use.
+    Connections older than max_lifetime are replaced. Every reused
+    connection gets a SELECT 1 before it is handed out, so one the server
+    dropped while idle is replaced instead of failing the caller's first
+    statement. A positive health_check_after skips that round trip for
+    connections idle less than that many seconds, until one comes back
+    broken. Connections that come back closed or mid-transaction are rolled
+    back or dropped.
+    """
+    
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=1800, health_check_after=0, timeout=30):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self.logger = get_logger(__name__)
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self.wait_latency = LatencyHistogram()
+        self.stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'created': 0, 'discarded': 0,
+                      'health_check_failures': 0, 'peak_in_use': 0}
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created_at = {}
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        
+        for _ in range(min_size):
+            self._idle.append((self._new_connection(), time.monotonic()))
+    
+    def _new_connection(self):
+        conn = self.connect()
+        with self._cond:
+            self._created_at[conn] = time.monotonic()
+            self._size += 1
+            self.stats['created'] += 1
+        return conn
+    
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        with self._cond:
+            self._created_at.pop(conn, None)
+            self._size -= 1
+            self.stats['discarded'] += 1
+            self._cond.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _expired(self, conn):
+        return self.max_lifetime and time.monotonic() - self._created_at.get(conn, 0) > self.max_lifetime
+    
+    def _healthy(self, conn, idle_since):
+        """Cheap checks always, then a round trip unless idle less than health_check_after"""
+        if conn.closed or self._expired(conn):
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            self.logger.warning(f"Pooled connection failed health check: {e}")
+            with self._cond:
+                self.stats['health_check_failures'] += 1
+            return False
+    
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to timeout (default self.timeout) seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    if self._idle or self._size < self.max_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(f"No connection available within {timeout}s ({self.max_size} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+                
+                # Newest idle connection first, so surplus ones age out
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    self._size += 1  # reserve the slot while connecting outside the lock
+            
+            if entry is None:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created_at[conn] = time.monotonic()
+                    self.stats['created'] += 1
+            else:
+                conn, idle_since = entry
+                if not self._healthy(conn, idle_since):
+                    self._discard(conn)
+                    continue
+            
+            with self._cond:
+                self._in_use += 1
+                self.stats['checkouts'] += 1
+                self.stats['waits'] += waited
+                self.stats['peak_in_use'] = max(self.stats['peak_in_use'], self._in_use)
+            self.wait_latency.record(time.monotonic() - started)
+            return conn
+    
+    def putconn(self, conn, discard=False):
+        """Return a connection, rolling back an open transaction and dropping broken or expired ones"""
+        with self._cond:
+            self._in_use -= 1
+        
+        if not discard and not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        
+        if conn.closed:
+            # The server or network dropped it, so the idle ones are suspect too: ping them on checkout
+            with self._cond:
+                self._idle = [(idle, 0) for idle, _ in self._idle]
+        
+        if discard or conn.closed or self._closed or self._expired(conn):
+            self._discard(conn)
+            return
+        
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a with block (or of a generator holding it)"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+    
+    def metrics(self):
+        """Pool size, utilization, checkout counters and wait time percentiles"""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._in_use
+        stats['max_size'] = self.max_size
+        stats['utilization'] = stats['in_use'] / self.max_size
+        stats['wait'] = self.wait_latency.summary()
+        return stats
+    
+    def close(self):
+        """Close idle connections now and checked-out ones as they come back"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
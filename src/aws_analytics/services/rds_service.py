@@ -1,33 +1,81 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import errors, sql
+from psycopg2.extras import RealDictCursor, execute_values
 from faker import Faker
+import io
+import itertools
+import multiprocessing
+import os
+import queue
 import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from ..config import Settings
 from ..utils import get_logger
+from .rds_copy import RowStream, COPY_READ_SIZE
+from .rds_pool import ConnectionPool
+
+BOOK_COLUMNS = ('title', 'author', 'publication_year', 'price')
+
+def _load_books_worker(worker_id, db_config, num_rows, seed, load_options, progress_queue):
+    """Process worker: generates and loads its share of books over its own connection"""
+    logger = get_logger(__name__)
+    rds = None
+    try:
+        # Forked workers inherit the parent's random state, reseed so they don't all insert the same rows
+        worker_seed = None if seed is None else seed + worker_id
+        random.seed(worker_seed)
+        rds = RDSService(db_config, min_pool_size=0, max_pool_size=1)
+        rds.fake.seed_instance(random.getrandbits(64))
+        
+        stats = rds.bulk_load('books', BOOK_COLUMNS, rds._random_books(num_rows), report_interval=0,
+                              progress=lambda loaded: progress_queue.put((worker_id, loaded, None, None)),
+                              **load_options)
+        progress_queue.put((worker_id, stats['rows'], stats, None))
+    except Exception as e:
+        logger.error(f"Load worker {worker_id} failed: {e}")
+        progress_queue.put((worker_id, None, None, str(e)))
+    finally:
+        if rds is not None:
+            rds.close()
 
 class RDSService:
     """RDS PostgreSQL service for database operations"""
     
-    def __init__(self, db_config=None):
+    def __init__(self, db_config=None, min_pool_size=None, max_pool_size=None, max_lifetime=None, pool_timeout=30):
         self.logger = get_logger(__name__)
         self.db_config = db_config or self._get_db_config()
         self.fake = Faker('en_US')
+        self.pool_options = {
+            'min_size': Settings.DB_POOL_MIN_SIZE if min_pool_size is None else min_pool_size,
+            'max_size': max_pool_size or Settings.DB_POOL_MAX_SIZE,
+            'max_lifetime': Settings.DB_POOL_MAX_LIFETIME if max_lifetime is None else max_lifetime,
+            'timeout': pool_timeout
+        }
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pool_pid = None
         
     def _get_db_config(self):
         """Get database configuration from environment"""
-        if not all([Settings.DB_NAME, Settings.DB_USER, Settings.DB_PASSWORD, Settings.DB_HOST]):
-            raise ValueError("Database configuration incomplete. Check DB_NAME, DB_USER, DB_PASSWORD, DB_HOST in .env")
-            
-        return {
+        if not all([Settings.DB_NAME, Settings.DB_USER, Settings.DB_HOST]):
+            raise ValueError("Database configuration incomplete. Check DB_NAME, DB_USER, DB_HOST in .env")
+        
+        # DB_PASSWORD may be left empty for a local server with trust/peer auth
+        config = {
             'dbname': Settings.DB_NAME,
             'user': Settings.DB_USER,
-            'password': Settings.DB_PASSWORD,
             'host': Settings.DB_HOST,
             'port': Settings.DB_PORT or '5432'
         }
+        if Settings.DB_PASSWORD:
+            config['password'] = Settings.DB_PASSWORD
+        return config
     
     def get_connection(self):
-        """Get database connection"""
+        """Open a new, unpooled database connection"""
         try:
             conn = psycopg2.connect(**self.db_config)
             return conn
@@ -35,66 +83,267 @@ class RDSService:
             self.logger.error(f"Database connection failed: {e}")
             raise
     
+    @property
+    def pool(self):
+        """Connection pool shared by queries and bulk loads, created on first use"""
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # Connections inherited over fork belong to the parent, never reuse or close them here
+                self._pool = ConnectionPool(self.get_connection, **self.pool_options)
+                self._pool_pid = os.getpid()
+            return self._pool
+    
+    def pool_metrics(self):
+        """Pool size, utilization and checkout wait percentiles"""
+        return self.pool.metrics()
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pool_pid == os.getpid():
+            pool.close()
+    
+    @contextmanager
+    def transaction(self, cursor_factory=RealDictCursor):
+        """Cursor on one pooled connection, committed when the block exits, rolled back on error
+        
+        with rds.transaction() as cur:
+            cur.execute("UPDATE books SET price = price * 0.9 WHERE publication_year < %s", (1950,))
+            cur.execute("SELECT count(*) AS n FROM books WHERE price < %s", (500,))
+        """
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=cursor_factory) as cur:
+                    yield cur
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+    
     def execute_query(self, query, params=None, fetch=False):
         """Execute SQL query"""
-        conn = None
         try:
-            conn = self.get_connection()
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with self.transaction() as cur:
                 cur.execute(query, params)
-                
-                if fetch:
-                    return cur.fetchall()
-                
-                conn.commit()
-                return cur.rowcount
-                
+                return cur.fetchall() if fetch else cur.rowcount
         except Exception as e:
-            if conn:
-                conn.rollback()
             self.logger.error(f"Query execution failed: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
     
-    def insert_random_books(self, num_rows=1000):
-        """Insert random book data"""
-        conn = None
+    def iter_query(self, query, params=None, batch_size=2000, row_format='dict'):
+        """Stream a large result through a named server-side cursor, batch_size rows per round trip
+        
+        row_format: 'dict' yields RealDictRows like execute_query, 'tuple'
+        yields plain tuples, 'columns' yields one {column: [values]} dict per
+        batch. Only one batch is held in memory; the pooled connection is
+        returned when the generator finishes or is closed.
+        """
+        if row_format not in ('dict', 'tuple', 'columns'):
+            raise ValueError(f"Unknown row format: {row_format}")
+        
+        streamed = 0
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
-                sql = """INSERT INTO books (title, author, publication_year, price)
-                         VALUES (%s, %s, %s, %s)"""
-                
-                self.logger.info(f"Inserting {num_rows} random books...")
-                
-                for i in range(num_rows):
-                    title = self.fake.sentence(nb_words=random.randint(3, 8))
-                    author = self.fake.name()
-                    publication_year = random.randint(1900, 2025)
-                    price = round(random.uniform(100.00, 2000.00), 2)
-                    
-                    cur.execute(sql, (title, author, publication_year, price))
+            with self.pool.connection() as conn:
+                cursor_factory = RealDictCursor if row_format == 'dict' else None
+                with conn.cursor(name=f"iter_query_{uuid.uuid4().hex}", cursor_factory=cursor_factory) as cur:
+                    cur.itersize = batch_size
+                    cur.execute(query, params)
                     
-                    if (i + 1) % 1000 == 0:
-                        self.logger.info(f"Inserted {i + 1} records...")
-                
+                    if row_format != 'columns':
+                        for row in cur:
+                            streamed += 1
+                            yield row
+                    else:
+                        while True:
+                            rows = cur.fetchmany(batch_size)
+                            if not rows:
+                                break
+                            streamed += len(rows)
+                            names = [column.name for column in cur.description]
+                            yield dict(zip(names, map(list, zip(*rows))))
                 conn.commit()
-                self.logger.info(f"Successfully inserted {num_rows} books")
+            self.logger.info(f"Streamed {streamed} rows")
+        except Exception as e:
+            self.logger.error(f"Streaming query failed after {streamed} rows: {e}")
+            raise
+    
+    def bulk_load(self, table, columns, rows, method='copy', page_size=1000, commit_every=50000,
+                  report_interval=10, progress=None):
+        """Stream rows (tuples in columns order) from any iterable into table
+        
+        method='copy' feeds COPY ... FROM STDIN from an incremental in-memory
+        stream and falls back to execute_values if the server refuses COPY
+        for the table; method='values' inserts page_size rows per
+        statement. Commits every commit_every rows, calling progress(loaded)
+        after each commit, returns rows and rows/s.
+        """
+        if method not in ('copy', 'values'):
+            raise ValueError(f"Unknown bulk load method: {method}")
+        
+        rows = iter(rows)
+        loaded = 0
+        started = time.monotonic()
+        last_report = started
+        try:
+            with self.pool.connection() as conn:
+                target = sql.SQL("{} ({})").format(
+                    sql.Identifier(*table.split('.')),
+                    sql.SQL(', ').join(map(sql.Identifier, columns))
+                )
+                copy_sql = sql.SQL("COPY {} FROM STDIN").format(target).as_string(conn)
+                insert_sql = sql.SQL("INSERT INTO {} VALUES %s").format(target).as_string(conn)
                 
+                with conn.cursor() as cur:
+                    if method == 'copy':
+                        # psycopg2 only sees a refused COPY after sending all data, so probe with no rows first.
+                        # Only a refusal falls back; a missing table or column, or no privilege, is raised.
+                        try:
+                            cur.copy_expert(copy_sql, io.BytesIO())
+                        except (errors.WrongObjectType, errors.FeatureNotSupported) as e:
+                            conn.rollback()
+                            self.logger.warning(f"COPY unavailable ({str(e).splitlines()[0]}), "
+                                                f"falling back to multi-row INSERT")
+                            method = 'values'
+                    
+                    while True:
+                        chunk = itertools.islice(rows, commit_every)
+                        if method == 'copy':
+                            stream = RowStream(chunk)
+                            cur.copy_expert(copy_sql, stream, size=COPY_READ_SIZE)
+                            count = stream.rows_read
+                        else:
+                            batch = list(chunk)
+                            execute_values(cur, insert_sql, batch, page_size=page_size)
+                            count = len(batch)
+                        
+                        if not count:
+                            break
+                        conn.commit()
+                        loaded += count
+                        if progress:
+                            progress(loaded)
+                        
+                        now = time.monotonic()
+                        if report_interval and now - last_report >= report_interval:
+                            self.logger.info(f"Loaded {loaded} rows into {table} ({loaded / (now - started):.0f} rows/s)")
+                            last_report = now
+            
+            elapsed = time.monotonic() - started
+            stats = {'rows': loaded, 'elapsed': elapsed, 'rows_per_sec': loaded / elapsed if elapsed > 0 else 0,
+                     'method': method}
+            self.logger.info(f"Loaded {loaded} rows into {table} in {elapsed:.1f}s "
+                             f"({stats['rows_per_sec']:.0f} rows/s, {method})")
+            return stats
+        
         except Exception as e:
-            if conn:
-                conn.rollback()
-            self.logger.error(f"Bulk insert failed: {e}")
+            self.logger.error(f"Bulk load failed after {loaded} committed rows: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
+    
+    def _random_books(self, num_rows):
+        """Lazily generate random book rows in BOOK_COLUMNS order"""
+        for _ in range(num_rows):
+            yield (
+                self.fake.sentence(nb_words=random.randint(3, 8)),
+                self.fake.name(),
+                random.randint(1900, 2025),
+                round(random.uniform(100.00, 2000.00), 2)
+            )
+    
+    def insert_random_books(self, num_rows=1000, method='copy', page_size=1000, commit_every=50000, seed=None):
+        """Insert random book data, returns bulk_load stats"""
+        if seed is not None:
+            random.seed(seed)
+            self.fake.seed_instance(seed)
+        self.logger.info(f"Inserting {num_rows} random books...")
+        stats = self.bulk_load('books', BOOK_COLUMNS, self._random_books(num_rows), method=method,
+                               page_size=page_size, commit_every=commit_every)
+        self.logger.info(f"Successfully inserted {stats['rows']} books")
+        return stats
+    
+    def parallel_insert_random_books(self, num_rows=1000, num_workers=4, method='copy', page_size=1000,
+                                     commit_every=10000, seed=None, report_interval=5):
+        """Split num_rows across worker processes, each generating and loading its share on its own connection
+        
+        Row generation (Faker) is the bottleneck of a single loader, so it
+        scales with processes. Workers report committed rows over a queue;
+        the parent logs aggregate progress and returns combined stats. A seed
+        makes every worker's rows reproducible.
+        """
+        if num_workers < 1:
+            raise ValueError(f"num_workers must be at least 1, got {num_workers}")
+        if num_rows < 0:
+            raise ValueError(f"num_rows must not be negative, got {num_rows}")
+        
+        base, extra = divmod(num_rows, num_workers)
+        shares = [base + (1 if i < extra else 0) for i in range(num_workers)]
+        load_options = {'method': method, 'page_size': page_size, 'commit_every': commit_every}
+        context = multiprocessing.get_context()
+        progress_queue = context.Queue()
+        
+        self.logger.info(f"Inserting {num_rows} random books with {num_workers} worker processes...")
+        started = time.monotonic()
+        workers = []
+        for worker_id, share in enumerate(shares):
+            process = context.Process(
+                target=_load_books_worker,
+                args=(worker_id, self.db_config, share, seed, load_options, progress_queue),
+                daemon=True
+            )
+            process.start()
+            workers.append(process)
+        
+        loaded = {}
+        results = {}
+        errors = {}
+        last_report = started
+        while len(results) + len(errors) < num_workers:
+            try:
+                worker_id, rows, stats, error = progress_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in workers):
+                    break
+                continue
+            
+            if error is not None:
+                errors[worker_id] = error
+            else:
+                loaded[worker_id] = rows
+                if stats is not None:
+                    results[worker_id] = stats
+            
+            now = time.monotonic()
+            if report_interval and now - last_report >= report_interval:
+                total = sum(loaded.values())
+                percent = 100 * total / num_rows if num_rows else 100
+                self.logger.info(f"Loaded {total}/{num_rows} books ({percent:.0f}%, "
+                                 f"{total / (now - started):.0f} rows/s, {num_workers - len(results)} workers running)")
+                last_report = now
+        
+        for process in workers:
+            process.join()
+        
+        elapsed = time.monotonic() - started
+        total = sum(loaded.values())
+        stats = {'rows': total, 'elapsed': elapsed, 'rows_per_sec': total / elapsed if elapsed > 0 else 0,
+                 'workers': num_workers, 'method': method,
+                 'worker_rows_per_sec': [results[i]['rows_per_sec'] for i in sorted(results)]}
+        
+        missing = [i for i in range(num_workers) if i not in results and i not in errors]
+        for worker_id in missing:
+            errors[worker_id] = f"exited with code {workers[worker_id].exitcode}"
+        if errors:
+            self.logger.error(f"Parallel load failed after {total} committed rows: {errors}")
+            raise RuntimeError(f"{len(errors)} of {num_workers} load workers failed: {errors}")
+        
+        self.logger.info(f"Successfully inserted {total} books in {elapsed:.1f}s "
+                         f"({stats['rows_per_sec']:.0f} rows/s, {num_workers} workers)")
+        return stats
     
     def create_books_table(self):
         """Create books table if not exists"""
-        sql = """
+        query = """
         CREATE TABLE IF NOT EXISTS books (
             id SERIAL PRIMARY KEY,
             title VARCHAR(255) NOT NULL,
@@ -106,7 +355,7 @@ class RDSService:
         """
         
         try:
-            self.execute_query(sql)
+            self.execute_query(query)
             self.logger.info("Books table created/verified")
         except Exception as e:
             self.logger.error(f"Failed to create table: {e}")
@@ -114,5 +363,5 @@ class RDSService:
     
     def get_books(self, limit=10):
         """Get books from database"""
-        sql = "SELECT * FROM books ORDER BY book_id desc LIMIT %s"
-        return self.execute_query(sql, (limit,), fetch=True)
\ No newline at end of file
+        query = "SELECT * FROM books ORDER BY id desc LIMIT %s"
+        return self.execute_query(query, (limit,), fetch=True)
\ No newline at end of file
@@ -1,4 +1,10 @@
 from .logger import get_logger
-from .aws_auth import get_aws_credentials
+from .aws_auth import get_aws_credentials, get_aws4auth, get_boto3_session, get_opensearch_signer
+from .metrics import LatencyHistogram
+from .rate_limit import TokenBucket
+from .ndjson import RotatingNDJSONWriter
+from .cache import TTLCache, canonical_key
+from .retry import backoff_delay
+from .serialization import get_serializer, register_serializer
 
-__all__ = ["get_logger", "get_aws_credentials"]
\ No newline at end of file
+__all__ = ["get_logger", "get_aws_credentials", "get_aws4auth", "get_boto3_session", "get_opensearch_signer", "LatencyHistogram", "TokenBucket", "RotatingNDJSONWriter", "TTLCache", "canonical_key", "backoff_delay", "get_serializer", "register_serializer"]
\ No newline at end of file
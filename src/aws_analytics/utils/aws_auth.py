@@ -1,11 +1,26 @@
 import boto3
+import threading
 from requests_aws4auth import AWS4Auth
 from ..config import Settings
 
+_session = None
+_session_lock = threading.Lock()
+
+def get_boto3_session():
+    """Process-wide boto3 session, so credentials are resolved and refreshed once"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = boto3.Session(region_name=Settings.AWS_REGION)
+        return _session
+
 def get_aws_credentials():
-    """Get AWS credentials for authentication"""
-    session = boto3.Session()
-    credentials = session.get_credentials()
+    """Get AWS credentials for authentication
+    
+    Returns the session's credentials object, which refreshes itself for
+    temporary (role, SSO, instance profile) credentials.
+    """
+    credentials = get_boto3_session().get_credentials()
     
     if not credentials:
         raise ValueError("AWS credentials not found")
@@ -14,7 +29,7 @@ def get_aws_credentials():
 
 def get_aws4auth(service: str = 'es'):
     """Get AWS4Auth for HTTP requests"""
-    credentials = get_aws_credentials()
+    credentials = get_aws_credentials().get_frozen_credentials()
     
     return AWS4Auth(
         credentials.access_key,
@@ -22,4 +37,13 @@ def get_aws4auth(service: str = 'es'):
         Settings.AWS_REGION,
         service,
         session_token=credentials.token
-    )
\ No newline at end of file
+    )
+
+def get_opensearch_signer(service: str = 'es'):
+    """SigV4 signer for opensearch-py that re-reads refreshable credentials on every request
+    
+    Use service='aoss' for OpenSearch Serverless.
+    """
+    from opensearchpy import Urllib3AWSV4SignerAuth
+    
+    return Urllib3AWSV4SignerAuth(get_aws_credentials(), Settings.AWS_REGION, service)
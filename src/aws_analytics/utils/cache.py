@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds
+    
+    Keys are (namespace, key) pairs so all entries of a namespace (for
+    example an index) can be invalidated at once. Every invalidation bumps
+    a generation counter; a value computed before an invalidation (read the
+    generation first, pass it to set()) is not stored. Tracks hit, miss,
+    eviction, invalidation and stale-store counters.
+    """
+    
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+                      'stale_sets': 0}
+    
+    @property
+    def generation(self):
+        """Counter bumped by every invalidate()"""
+        return self._generation
+    
+    def get(self, namespace, key, default=None):
+        """Cached value, or default when missing or expired"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self.stats['misses'] += 1
+                return default
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[(namespace, key)]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return default
+            self._entries.move_to_end((namespace, key))
+            self.stats['hits'] += 1
+            return value
+    
+    def set(self, namespace, key, value, generation=None):
+        """Store a value, evicting the least recently used entries beyond max_entries
+        
+        With generation, the value is dropped if an invalidation happened since.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self.stats['stale_sets'] += 1
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def invalidate(self, namespace=None, match=None):
+        """Drop every entry of a namespace (or whose namespace satisfies match), or everything"""
+        with self._lock:
+            self._generation += 1
+            if namespace is None and match is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                match = match or (lambda entry_namespace: entry_namespace == namespace)
+                keys = [key for key in self._entries if match(key[0])]
+                for key in keys:
+                    del self._entries[key]
+                dropped = len(keys)
+            self.stats['invalidations'] += dropped
+    
+    def __len__(self):
+        return len(self._entries)
+
+def canonical_key(*parts):
+    """Stable string key for JSON-like values, independent of dict key order"""
+    return json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
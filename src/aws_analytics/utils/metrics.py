@@ -0,0 +1,112 @@
+import threading
+
+class LatencyHistogram:
+    """HDR-style latency histogram with bounded relative error
+    
+    Values are recorded in microseconds into log-linear buckets: exact below
+    2 * sub_buckets, then sub_buckets buckets per power of two, so any
+    reported percentile is within 1 / sub_buckets of the true value.
+    """
+    
+    def __init__(self, sub_buckets=128):
+        if sub_buckets & (sub_buckets - 1):
+            raise ValueError("sub_buckets must be a power of two")
+        self.sub_buckets = sub_buckets
+        self._sub_bits = sub_buckets.bit_length() - 1
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Drop all recorded values"""
+        with self._lock:
+            self._counts = {}
+            self.count = 0
+            self.total = 0
+            self.min = None
+            self.max = None
+    
+    def _index(self, value):
+        """Bucket index for a value in microseconds"""
+        if value < 2 * self.sub_buckets:
+            return value
+        shift = value.bit_length() - self._sub_bits - 1
+        return shift * self.sub_buckets + (value >> shift)
+    
+    def _value(self, index):
+        """Midpoint in microseconds of the bucket at index"""
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        lower = (index - shift * self.sub_buckets) << shift
+        return lower + ((1 << shift) - 1) / 2
+    
+    def record(self, seconds):
+        """Record one latency in seconds"""
+        value = max(int(seconds * 1_000_000), 0)
+        index = self._index(value)
+        
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+    
+    def percentile(self, percent):
+        """Latency in seconds at the given percentile (0-100)"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            
+            target = max(1, int(round(self.count * percent / 100.0)))
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= target:
+                    value = min(self._value(index), self.max)
+                    return value / 1_000_000
+            return self.max / 1_000_000
+    
+    def mean(self):
+        """Mean latency in seconds"""
+        with self._lock:
+            return self.total / self.count / 1_000_000 if self.count else 0.0
+    
+    def merge(self, other):
+        """Add all values recorded by another histogram or snapshot"""
+        snapshot = other.snapshot() if isinstance(other, LatencyHistogram) else other
+        
+        with self._lock:
+            for index, count in snapshot['counts'].items():
+                index = int(index)
+                self._counts[index] = self._counts.get(index, 0) + count
+            self.count += snapshot['count']
+            self.total += snapshot['total']
+            if snapshot['min'] is not None and (self.min is None or snapshot['min'] < self.min):
+                self.min = snapshot['min']
+            if snapshot['max'] is not None and (self.max is None or snapshot['max'] > self.max):
+                self.max = snapshot['max']
+    
+    def snapshot(self):
+        """Plain, picklable copy of the histogram state"""
+        with self._lock:
+            return {
+                'sub_buckets': self.sub_buckets,
+                'counts': dict(self._counts),
+                'count': self.count,
+                'total': self.total,
+                'min': self.min,
+                'max': self.max
+            }
+    
+    def summary(self):
+        """Count plus p50/p95/p99/max latency in milliseconds"""
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': (self.max or 0) / 1000
+        }
@@ -0,0 +1,127 @@
+import threading
+import time
+from ..config import Settings
+from .logger import get_logger
+
+def _abstract_token_provider():
+    """kafka-python's AbstractTokenProvider, wherever this release keeps it"""
+    try:
+        # kafka-python >= 3
+        from kafka.net.sasl.oauth import AbstractTokenProvider
+    except ImportError:
+        try:
+            from kafka.sasl.oauth import AbstractTokenProvider
+        except ImportError:
+            # kafka-python < 2.1
+            from kafka.oauth.abstract import AbstractTokenProvider
+    return AbstractTokenProvider
+
+class MSKTokenProvider:
+    """MSK IAM OAUTHBEARER token provider with a cached, pre-refreshed token
+    
+    The signed token is generated once and refreshed on a background timer
+    refresh_margin seconds before it expires, so connections and reconnects
+    never sign on the hot path. Use get_msk_token_provider() to share one
+    provider across all producers and consumers in a process.
+    
+    The class is registered as a kafka-python AbstractTokenProvider, and the
+    MSK signer imported, only when IAM auth is first configured, so other
+    auth modes and services need neither.
+    """
+    
+    def __init__(self, region=None, refresh_margin=120, retry_interval=10):
+        self.logger = get_logger(__name__)
+        self.region = region or Settings.AWS_REGION
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0
+        self._timer = None
+        self._closed = False
+    
+    def extensions(self):
+        """No SASL extensions"""
+        return {}
+    
+    def token(self):
+        """Cached token, signs synchronously only if the background refresh fell behind"""
+        if self._token is None or time.time() >= self._expires_at:
+            self._refresh()
+        return self._token
+    
+    def _refresh(self, force=False):
+        """Sign a new token and schedule the next refresh"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MSK token provider is closed")
+            if not force and self._token is not None and time.time() < self._expires_at:
+                # Another caller refreshed while we waited for the lock
+                return
+            
+            try:
+                from aws_msk_iam_sasl_signer import MSKAuthTokenProvider
+                token, expiry_ms = MSKAuthTokenProvider.generate_auth_token(self.region)
+            except Exception as e:
+                self.logger.error(f"Failed to generate MSK auth token: {e}")
+                self._schedule(self.retry_interval)
+                if self._token is None or time.time() >= self._expires_at:
+                    raise
+                return
+            
+            self._token = token
+            self._expires_at = expiry_ms / 1000
+            self._schedule(max(self._expires_at - time.time() - self.refresh_margin, self.retry_interval))
+    
+    def _schedule(self, delay):
+        """Replace the pending background refresh"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _background_refresh(self):
+        try:
+            self._refresh(force=True)
+        except Exception as e:
+            self.logger.error(f"Background MSK token refresh failed: {e}")
+    
+    def close(self):
+        """Stop background refreshes"""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+    
+    def __reduce__(self):
+        # Child processes (MSK load generator process mode) get their own shared provider
+        return (get_msk_token_provider, (self.region,))
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_msk_token_provider(region=None):
+    """Get the process-wide token provider for a region"""
+    region = region or Settings.AWS_REGION
+    with _providers_lock:
+        provider = _providers.get(region)
+        if provider is None:
+            provider = MSKTokenProvider(region)
+            _providers[region] = provider
+        return provider
+
+def msk_auth_config(auth=None):
+    """Producer/consumer security settings for an MSK auth mode (none or iam)"""
+    auth = (auth or 'none').lower()
+    if auth == 'none':
+        return {}
+    if auth == 'iam':
+        _abstract_token_provider().register(MSKTokenProvider)
+        return {
+            'security_protocol': 'SASL_SSL',
+            'sasl_mechanism': 'OAUTHBEARER',
+            'sasl_oauth_token_provider': get_msk_token_provider()
+        }
+    raise ValueError(f"Unknown MSK auth mode: {auth}")
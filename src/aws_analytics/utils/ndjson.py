@@ -0,0 +1,95 @@
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+class RotatingNDJSONWriter:
+    """Stream records to size/time-rotated NDJSON segment files
+    
+    Each segment is written to a ".part" file and only renamed to its final
+    name after it has been flushed and fsynced, so a finished segment on disk
+    is always complete.
+    """
+    
+    def __init__(self, directory, prefix='records', max_bytes=128 * 1024 * 1024, max_seconds=300,
+                 compress=False, encoder=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compress = compress
+        self.encoder = encoder or (lambda record: json.dumps(record, ensure_ascii=False, default=str))
+        self.segments = []
+        self._file = None
+        self._path = None
+        self._opened_at = None
+        self._bytes = 0
+        self._records = 0
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+    
+    def _open(self):
+        """Start a new segment"""
+        timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        suffix = '.ndjson.gz' if self.compress else '.ndjson'
+        name = f"{self.prefix}_{timestamp}_{self._sequence:05d}{suffix}"
+        self._sequence += 1
+        self._path = os.path.join(self.directory, name)
+        
+        raw = open(self._path + '.part', 'wb')
+        self._file = gzip.GzipFile(fileobj=raw, mode='wb') if self.compress else raw
+        self._opened_at = time.monotonic()
+        self._bytes = 0
+        self._records = 0
+    
+    @property
+    def segment_records(self):
+        """Records written to the open segment"""
+        return self._records
+    
+    def write(self, record):
+        """Append one record as a JSON line"""
+        if self._file is None:
+            self._open()
+        line = (self.encoder(record) + '\n').encode('utf-8')
+        self._file.write(line)
+        self._bytes += len(line)
+        self._records += 1
+    
+    def should_rotate(self):
+        """Whether the open segment has reached its size or age limit"""
+        if self._file is None:
+            return False
+        if self.max_bytes and self._bytes >= self.max_bytes:
+            return True
+        return bool(self.max_seconds) and time.monotonic() - self._opened_at >= self.max_seconds
+    
+    def rotate(self):
+        """Durably close the open segment, returns its path or None if nothing was open"""
+        if self._file is None:
+            return None
+        
+        raw = self._file.fileobj if self.compress else self._file
+        if self.compress:
+            self._file.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+        raw.close()
+        os.replace(self._path + '.part', self._path)
+        
+        path = self._path
+        self.segments.append(path)
+        self._file = None
+        self._path = None
+        return path
+    
+    def close(self):
+        """Finish the open segment"""
+        return self.rotate()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,52 @@
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter
+    
+    Tokens are refilled from the monotonic clock on every call, so time spent
+    outside acquire() (serialization, send calls) is credited back instead of
+    being added on top of a fixed sleep.
+    """
+    
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate / 100)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+    
+    def _refill(self):
+        """Add tokens for the time elapsed since the last call"""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_acquire(self, tokens=1):
+        """Take tokens if available, without waiting"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+    
+    def acquire(self, tokens=1, stop_event=None):
+        """Block until tokens are available, returns False if stop_event is set first"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                self._sleep(wait)
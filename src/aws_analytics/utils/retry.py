@@ -0,0 +1,5 @@
+import random
+
+def backoff_delay(attempt, base=0.1, cap=10.0):
+    """Full-jitter exponential backoff delay in seconds for a 0-based retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
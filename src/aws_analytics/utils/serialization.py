@@ -0,0 +1,86 @@
+import json
+from operator import itemgetter
+
+def json_serializer(value):
+    """Serialize value as UTF-8 JSON"""
+    return json.dumps(value).encode('utf-8')
+
+class FixedSchemaEncoder:
+    """JSON encoder precompiled for dicts with a fixed set of typed fields
+    
+    Output matches json.dumps for the same key order, but each call is one
+    %-format of a prebuilt template instead of a walk of the dict.
+    """
+    
+    _FORMATS = {int: '%d', float: '%r', str: '%s', bool: '%s'}
+    
+    def __init__(self, schema):
+        self.schema = dict(schema)
+        for field_type in self.schema.values():
+            if field_type not in self._FORMATS:
+                raise ValueError(f"Unsupported field type: {field_type}")
+        
+        fields = list(self.schema)
+        self._getter = itemgetter(*fields) if len(fields) > 1 else (lambda value: (value[fields[0]],))
+        self._template = '{' + ', '.join(
+            f"{json.dumps(name)}: {self._FORMATS[field_type]}" for name, field_type in self.schema.items()
+        ) + '}'
+        self._string_fields = [i for i, field_type in enumerate(self.schema.values()) if field_type in (str, bool)]
+    
+    def __call__(self, value):
+        values = self._getter(value)
+        if self._string_fields:
+            values = list(values)
+            for i in self._string_fields:
+                values[i] = json.dumps(values[i])
+        return (self._template % tuple(values)).encode('utf-8')
+    
+    def __getstate__(self):
+        return {'schema': self.schema}
+    
+    def __setstate__(self, state):
+        self.__init__(state['schema'])
+    
+    def __repr__(self):
+        return f"FixedSchemaEncoder({self.schema!r})"
+
+# Shape of the messages sent by MSKService.generate_load
+LOAD_MESSAGE_SCHEMA = {'timestamp': float, 'thread_id': int, 'count': int}
+
+def _orjson_serializer():
+    import orjson
+    return orjson.dumps
+
+def _msgpack_serializer():
+    import msgpack
+    return msgpack.packb
+
+_SERIALIZERS = {
+    'json': lambda: json_serializer,
+    'orjson': _orjson_serializer,
+    'msgpack': _msgpack_serializer,
+    'load-message': lambda: FixedSchemaEncoder(LOAD_MESSAGE_SCHEMA)
+}
+
+def register_serializer(name, factory):
+    """Register a serializer factory, called lazily to build a value -> bytes callable"""
+    _SERIALIZERS[name] = factory
+
+def available_serializers():
+    """Names of registered serializers whose dependencies are installed"""
+    names = []
+    for name in _SERIALIZERS:
+        try:
+            get_serializer(name)
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+def get_serializer(name):
+    """Build the value -> bytes callable registered under name"""
+    if callable(name):
+        return name
+    if name not in _SERIALIZERS:
+        raise ValueError(f"Unknown serializer: {name}. Available: {', '.join(_SERIALIZERS)}")
+    return _SERIALIZERS[name]()
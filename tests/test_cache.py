@@ -0,0 +1,42 @@
+from aws_analytics.services.opensearch_service import OpenSearchService
+from aws_analytics.utils import TTLCache
+
+def test_set_after_invalidation_is_dropped():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.invalidate('books')
+    cache.set('books', 'query', 'stale', generation)
+    assert cache.get('books', 'query') is None
+    assert cache.stats['stale_sets'] == 1
+    
+    cache.set('books', 'query', 'fresh', cache.generation)
+    assert cache.get('books', 'query') == 'fresh'
+
+def test_set_without_generation_always_stores():
+    cache = TTLCache()
+    cache.invalidate()
+    cache.set('books', 'query', 'value')
+    assert cache.get('books', 'query') == 'value'
+
+class WriteDuringSearchClient:
+    """Search client whose first search races with a write invalidating the index"""
+    
+    def __init__(self):
+        self.service = None
+        self.searches = 0
+    
+    def search(self, index, body, size):
+        self.searches += 1
+        if self.searches == 1:
+            self.service.invalidate_cache(index)
+        return {'searches': self.searches}
+
+def test_search_racing_a_write_is_not_cached():
+    client = WriteDuringSearchClient()
+    service = OpenSearchService(client=client, cache=TTLCache())
+    client.service = service
+    
+    query = {'query': {'match_all': {}}}
+    assert service.search('books', query) == {'searches': 1}
+    assert service.search('books', query) == {'searches': 2}
+    assert service.search('books', query) == {'searches': 2}
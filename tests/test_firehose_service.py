@@ -0,0 +1,92 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from aws_analytics.services.firehose_service import MAX_BYTES_PER_BATCH, FirehoseService
+
+mock_aws = pytest.importorskip('moto').mock_aws
+
+STREAM_NAME = 'test-stream'
+
+class RecordingClient:
+    """Firehose client wrapper recording batch sizes and injecting per-call failures
+    
+    failures maps a call number to the indices to fail, or to an exception to raise.
+    """
+    
+    def __init__(self, client, failures=None):
+        self.client = client
+        self.failures = failures or {}
+        self.batches = []
+    
+    def put_record_batch(self, DeliveryStreamName, Records):
+        self.batches.append(Records)
+        failure = self.failures.get(len(self.batches))
+        if isinstance(failure, Exception):
+            raise failure
+        response = self.client.put_record_batch(DeliveryStreamName=DeliveryStreamName, Records=Records)
+        for index in failure or ():
+            response['RequestResponses'][index] = {'ErrorCode': 'ServiceUnavailableException', 'ErrorMessage': 'busy'}
+        return response
+
+@pytest.fixture
+def firehose(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='firehose-test')
+        client = boto3.client('firehose', region_name='us-east-1')
+        client.create_delivery_stream(
+            DeliveryStreamName=STREAM_NAME,
+            ExtendedS3DestinationConfiguration={
+                'RoleARN': 'arn:aws:iam::123456789012:role/firehose',
+                'BucketARN': 'arn:aws:s3:::firehose-test'
+            }
+        )
+        yield client
+
+def make_service(client, failures=None):
+    return FirehoseService(RecordingClient(client, failures), STREAM_NAME, max_workers=1, base_backoff=0)
+
+def test_batches_respect_record_limit(firehose):
+    service = make_service(firehose)
+    stats = service.put_records({'i': i} for i in range(1201))
+    assert [len(batch) for batch in service.client.batches] == [500, 500, 201]
+    assert stats['records'] == 1201
+    assert stats['failed'] == 0
+    assert stats['requests'] == 3
+
+def test_batches_respect_byte_limit(firehose):
+    service = make_service(firehose)
+    record = b'x' * (512 * 1024 - 1)
+    stats = service.put_records(record for _ in range(10))
+    assert [len(batch) for batch in service.client.batches] == [8, 2]
+    assert all(sum(len(r['Data']) for r in batch) <= MAX_BYTES_PER_BATCH for batch in service.client.batches)
+    assert stats['bytes'] == 10 * 512 * 1024
+
+def test_failed_entries_are_retried(firehose):
+    service = make_service(firehose, failures={1: [1, 3]})
+    records = [f'record-{i}' for i in range(5)]
+    stats = service.put_records(records)
+    retried = service.client.batches[1]
+    assert [r['Data'] for r in retried] == [b'record-1\n', b'record-3\n']
+    assert stats['records'] == 5
+    assert stats['failed'] == 0
+    assert stats['retries'] == 2
+    assert stats['requests'] == 2
+
+def test_retry_exception_keeps_delivered_results(firehose):
+    denied = ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'denied'}}, 'PutRecordBatch')
+    service = make_service(firehose, failures={1: [9], 2: denied})
+    stats = {'records': 0, 'failed': 0, 'bytes': 0, 'requests': 0, 'retries': 0}
+    batch = [f'record-{i}\n'.encode('utf-8') for i in range(10)]
+    results = service.send_batch(batch, stats)
+    assert all('RecordId' in result for result in results[:9])
+    assert results[9]['ErrorCode'] == 'AccessDeniedException'
+    assert stats['records'] == 9
+    assert stats['failed'] == 1
+
+def test_first_attempt_exception_is_raised(firehose):
+    denied = ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'denied'}}, 'PutRecordBatch')
+    service = make_service(firehose, failures={1: denied})
+    with pytest.raises(ClientError):
+        service.put_records(['record'])
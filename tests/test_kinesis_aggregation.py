@@ -0,0 +1,105 @@
+import hashlib
+import pytest
+from aws_analytics.services.kinesis_aggregation import (
+    DIGEST_SIZE, KPL_MAGIC, MAX_RECORD_BYTES, AggregatingBuffer, RecordAggregator, aggregate_entries,
+    deaggregate_record, deaggregate_records
+)
+from aws_analytics.services.kinesis_shard_map import ShardMap
+
+class FakeKinesisClient:
+    """list_shards over evenly split hash key ranges"""
+    
+    def __init__(self, shard_count):
+        step = 2 ** 128 // shard_count
+        self.shards = []
+        for i in range(shard_count):
+            end = (i + 1) * step - 1 if i < shard_count - 1 else 2 ** 128 - 1
+            self.shards.append({
+                'ShardId': f'shardId-{i:012d}',
+                'HashKeyRange': {'StartingHashKey': str(i * step), 'EndingHashKey': str(end)},
+                'SequenceNumberRange': {'StartingSequenceNumber': '0'}
+            })
+    
+    def list_shards(self, **kwargs):
+        return {'Shards': self.shards}
+
+def test_round_trip():
+    aggregator = RecordAggregator()
+    records = [(f'record-{i}'.encode('utf-8'), f'key-{i % 3}', None) for i in range(10)]
+    records.append((b'explicit', 'key-0', str(2 ** 127)))
+    for data, partition_key, explicit_hash_key in records:
+        aggregator.add(data, partition_key, explicit_hash_key)
+    
+    entry = aggregator.to_entry()
+    data = entry['Data']
+    assert data.startswith(KPL_MAGIC)
+    assert hashlib.md5(data[len(KPL_MAGIC):-DIGEST_SIZE]).digest() == data[-DIGEST_SIZE:]
+    assert entry['PartitionKey'] == 'key-0'
+    assert 'ExplicitHashKey' not in entry
+    
+    user_records = deaggregate_record(dict(entry, SequenceNumber='42'))
+    assert [(r['Data'], r['PartitionKey'], r.get('ExplicitHashKey')) for r in user_records] == records
+    assert [r['SubSequenceNumber'] for r in user_records] == list(range(len(records)))
+    assert {r['SequenceNumber'] for r in user_records} == {'42'}
+
+def test_corrupted_digest_is_returned_unchanged():
+    aggregator = RecordAggregator()
+    aggregator.add(b'a', 'key')
+    aggregator.add(b'b', 'key')
+    entry = aggregator.to_entry()
+    record = dict(entry, Data=entry['Data'][:-1] + bytes([entry['Data'][-1] ^ 1]))
+    assert deaggregate_record(record) == [record]
+
+def test_plain_records_pass_through():
+    records = [{'Data': b'plain', 'PartitionKey': 'key', 'SequenceNumber': '1'}]
+    assert deaggregate_records(records) == records
+
+def test_single_record_is_sent_unaggregated():
+    entries = list(aggregate_entries([{'Data': b'only', 'PartitionKey': 'key', 'ExplicitHashKey': '7'}]))
+    assert entries == [{'Data': b'only', 'PartitionKey': 'key', 'ExplicitHashKey': '7'}]
+
+def test_single_record_up_to_plain_limit():
+    partition_key = 'key'
+    data = b'x' * (MAX_RECORD_BYTES - len(partition_key))
+    aggregator = RecordAggregator()
+    aggregator.add(data, partition_key)
+    assert aggregator.to_entry() == {'Data': data, 'PartitionKey': partition_key}
+    
+    with pytest.raises(ValueError):
+        RecordAggregator().add(data + b'x', partition_key)
+
+def test_second_record_over_limit_starts_new_aggregate():
+    data = b'x' * (MAX_RECORD_BYTES // 2)
+    entries = list(aggregate_entries({'Data': data, 'PartitionKey': 'key'} for _ in range(3)))
+    assert len(entries) == 3
+    assert all(entry['Data'] == data for entry in entries)
+
+def test_aggregates_group_by_predicted_shard():
+    shard_map = ShardMap(FakeKinesisClient(4), 'stream')
+    entries = [{'Data': f'{i}'.encode('utf-8'), 'PartitionKey': f'customer-{i % 50}'} for i in range(1000)]
+    aggregated = list(aggregate_entries(entries, shard_map=shard_map))
+    assert len(aggregated) == 4
+    
+    for entry in aggregated:
+        shard_id = shard_map.shard_for_key(entry['PartitionKey'])['ShardId']
+        user_records = deaggregate_record(entry)
+        assert {shard_map.shard_for_key(r['PartitionKey'])['ShardId'] for r in user_records} == {shard_id}
+        # Each key keeps its send order within the shard's aggregate
+        ids = [int(r['Data']) for r in user_records if r['PartitionKey'] == 'customer-0']
+        assert ids == sorted(ids)
+
+def test_explicit_hash_keys_group_by_shard():
+    shard_map = ShardMap(FakeKinesisClient(2), 'stream')
+    buffer = AggregatingBuffer(shard_map=shard_map)
+    for i in range(4):
+        buffer.add(b'low', f'low-{i}', str(i))
+        buffer.add(b'high', f'high-{i}', str(2 ** 128 - 1 - i))
+    entries = buffer.flush()
+    assert len(entries) == 2
+    assert {entry['ExplicitHashKey'] for entry in entries} == {'0', str(2 ** 128 - 1)}
+    for entry in entries:
+        assert {r['Data'] for r in deaggregate_record(entry)} == {b'high' if int(entry['ExplicitHashKey']) else b'low'}
+
+def test_default_grouping_without_shard_map():
+    entries = list(aggregate_entries({'Data': b'x', 'PartitionKey': f'key-{i % 2}'} for i in range(4)))
+    assert sorted(entry['PartitionKey'] for entry in entries) == ['key-0', 'key-1']
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from decimal import Decimal
+from aws_analytics.services.rds_copy import RowStream, copy_text_row, copy_text_value
+
+def test_copy_text_value_escapes():
+    assert copy_text_value('a\tb\nc\\d\re') == 'a\\tb\\nc\\\\d\\re'
+    assert copy_text_value('\\N') == '\\\\N'
+    assert copy_text_value(None) == '\\N'
+
+def test_copy_text_value_types():
+    assert copy_text_value(True) == 't'
+    assert copy_text_value(False) == 'f'
+    assert copy_text_value(0) == '0'
+    assert copy_text_value(Decimal('12.50')) == '12.50'
+    assert copy_text_value(date(2024, 2, 29)) == '2024-02-29'
+    assert copy_text_value(datetime(2024, 2, 29, 13, 5, 1)) == '2024-02-29T13:05:01'
+    assert copy_text_value('żółw') == 'żółw'
+
+def test_copy_text_row():
+    assert copy_text_row(('a b', None, 3)) == 'a b\t\\N\t3\n'
+
+def test_row_stream_reads_whole_stream():
+    rows = [('title', i) for i in range(3)]
+    stream = RowStream(rows)
+    assert stream.read() == b''.join(copy_text_row(row).encode('utf-8') for row in rows)
+    assert stream.read() == b''
+    assert stream.rows_read == 3
+
+def test_row_stream_splits_rows_across_reads():
+    rows = [('x' * 5, i) for i in range(10)]
+    expected = b''.join(copy_text_row(row).encode('utf-8') for row in rows)
+    stream = RowStream(iter(rows))
+    chunks = []
+    while True:
+        chunk = stream.read(7)
+        if not chunk:
+            break
+        assert len(chunk) <= 7
+        chunks.append(chunk)
+    assert b''.join(chunks) == expected
+    assert stream.bytes_read == len(expected)
+    assert stream.rows_read == 10
+
+def test_row_stream_formats_rows_lazily():
+    consumed = []
+    
+    def rows():
+        for i in range(100):
+            consumed.append(i)
+            yield ('row', i)
+    
+    stream = RowStream(rows())
+    stream.read(8)
+    assert len(consumed) == 2
+
+def test_row_stream_multibyte_boundary():
+    rows = [('żółw',), ('ä',)]
+    stream = RowStream(rows)
+    data = b''.join(iter(lambda: stream.read(3), b''))
+    assert data.decode('utf-8') == 'żółw\nä\n'
+
+def test_row_stream_empty():
+    stream = RowStream([])
+    assert stream.read(1024) == b''
+    assert stream.rows_read == 0
@@ -0,0 +1,162 @@
+import threading
+import time
+import pytest
+from psycopg2 import extensions
+from aws_analytics.services.rds_pool import ConnectionPool, PoolTimeout
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, query):
+        if self.conn.broken:
+            raise RuntimeError("server closed the connection")
+        self.conn.pings += 1
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.pings = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+    
+    def cursor(self):
+        return FakeCursor(self)
+    
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+    
+    def get_transaction_status(self):
+        return self.status
+    
+    def close(self):
+        self.closed = 1
+
+class FakeConnect:
+    def __init__(self):
+        self.connections = []
+    
+    def __call__(self):
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeConnect(), min_size=3, max_size=2)
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeConnect(), min_size=0, max_size=0)
+
+def test_min_size_connections_are_opened_upfront():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=2, max_size=4)
+    assert len(connect.connections) == 2
+    assert pool.metrics()['idle'] == 2
+
+def test_connections_are_reused():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=0, max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert len(connect.connections) == 1
+    assert pool.metrics()['checkouts'] == 2
+
+def test_grows_to_max_size_then_times_out():
+    pool = ConnectionPool(FakeConnect(), min_size=0, max_size=2, timeout=0.05)
+    conns = [pool.getconn(), pool.getconn()]
+    assert conns[0] is not conns[1]
+    
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    metrics = pool.metrics()
+    assert metrics['timeouts'] == 1
+    assert metrics['in_use'] == 2
+    assert metrics['utilization'] == 1
+
+def test_waiting_checkout_gets_returned_connection():
+    pool = ConnectionPool(FakeConnect(), min_size=0, max_size=1, timeout=5)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+    assert pool.getconn() is conn
+    assert pool.metrics()['waits'] == 1
+
+def test_expired_connections_are_replaced():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=1, max_size=1, max_lifetime=0.01)
+    old = connect.connections[0]
+    time.sleep(0.02)
+    conn = pool.getconn()
+    assert conn is not old
+    assert old.closed
+    assert pool.metrics()['discarded'] == 1
+
+def test_open_transaction_is_rolled_back_on_return():
+    pool = ConnectionPool(FakeConnect(), min_size=0, max_size=1)
+    conn = pool.getconn()
+    conn.status = extensions.TRANSACTION_STATUS_INERROR
+    pool.putconn(conn)
+    assert conn.status == extensions.TRANSACTION_STATUS_IDLE
+    assert pool.getconn() is conn
+
+def test_closed_connection_is_dropped_on_return():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=0, max_size=1)
+    conn = pool.getconn()
+    conn.closed = 2
+    pool.putconn(conn)
+    assert pool.metrics()['size'] == 0
+    assert pool.getconn() is not conn
+
+def test_failed_connect_frees_the_slot():
+    attempts = []
+    
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("connection refused")
+        return FakeConnection()
+    
+    pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.05)
+    with pytest.raises(RuntimeError):
+        pool.getconn()
+    assert pool.getconn() is not None
+
+def test_close_discards_idle_and_returned_connections():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=2, max_size=2)
+    conn = pool.getconn()
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.getconn()
+    pool.putconn(conn)
+    assert all(c.closed for c in connect.connections)
+    assert pool.metrics()['size'] == 0
+
+def test_dropped_idle_connection_is_replaced_on_checkout():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=1, max_size=1)
+    dropped = connect.connections[0]
+    dropped.broken = True
+    conn = pool.getconn()
+    assert conn is not dropped
+    assert dropped.closed
+    assert pool.metrics()['health_check_failures'] == 1
+
+def test_health_check_after_skips_recently_used_connections():
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=1, max_size=1, health_check_after=60)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.pings == 0